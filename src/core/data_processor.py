@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Обработка собранных постов: локальный фильтр по ключевым словам"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Регулярное выражение из префиксного дерева слов.
+
+    В отличие от простой альтернативы `слово1|слово2|...` общие префиксы
+    проверяются один раз, поэтому скорость почти не зависит от числа слов.
+    Окончания слов — необязательные жадные группы, так что в каждой позиции
+    находится самое длинное совпадение.
+    """
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if is_end else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Поиск множества слов в тексте за один проход"""
+
+    def __init__(self, words: Iterable[str]):
+        # Ключ — слово в нижнем регистре, значение — как оно задано пользователем
+        self.words = {w.strip().lower(): w.strip() for w in words if w and w.strip()}
+        self._regex = None
+        if self.words:
+            # (?<!\w) — совпадение только с начала слова: «нефт» найдёт «нефтяной», но не «бензонефть»
+            self._regex = re.compile(r"(?<!\w)" + _trie_pattern(self.words), re.IGNORECASE)
+
+    def __bool__(self) -> bool:
+        return self._regex is not None
+
+    def find(self, text: str) -> List[str]:
+        """Список найденных слов (без повторов, в порядке первого вхождения)"""
+        if not self._regex or not text:
+            return []
+        found = {}
+        for match in self._regex.finditer(text):
+            word = self.words.get(match.group(0).lower())
+            if word:
+                found.setdefault(word, None)
+        return list(found)
+
+    def search(self, text: str) -> bool:
+        """Есть ли в тексте хотя бы одно слово (останавливается на первом)"""
+        return bool(self._regex and text and self._regex.search(text))
+
+
+class KeywordFilter:
+    """
+    Локальный фильтр постов по ключевым и стоп-словам.
+
+    Сопоставители строятся один раз из тысяч слов, каждый пост проверяется
+    за один проход по тексту. Прошедшие посты получают поле
+    'matched_keywords' со списком найденных ключевых слов.
+    """
+
+    def __init__(self, keywords: Iterable[str], stop_words: Optional[Iterable[str]] = None):
+        self.keywords = KeywordMatcher(keywords)
+        self.stop_words = KeywordMatcher(stop_words or [])
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords) or bool(self.stop_words)
+
+    def apply(self, posts: List[Dict]) -> List[Dict]:
+        """Посты, прошедшие фильтр (с полем 'matched_keywords')"""
+        result = []
+        for post in posts:
+            text = post.get('text', '')
+            if self.stop_words.search(text):
+                continue
+            if self.keywords:
+                matched = self.keywords.find(text)
+                if not matched:
+                    continue
+                post['matched_keywords'] = ", ".join(matched)
+            result.append(post)
+        return result
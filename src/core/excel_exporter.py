@@ -1,99 +1,196 @@
 # -*- coding: utf-8 -*-
 """Экспорт данных в Excel с обработкой длинных текстов"""
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, Border, Side
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from pathlib import Path
 
+HEADERS = [
+    "Группа_ID", "Группа_название", "Пост_ID", "Дата_публикации",
+    "Текст_полный", "Лайки", "Репосты", "Комментарии", "Ссылка_на_пост"
+]
+
+# Вложения поста (фото, видео, ссылки, документы) — после базовых колонок,
+# чтобы отчёты без неё по-прежнему распознавались при обновлении метрик
+ATTACHMENTS_HEADER = "Вложения"
+
+# Дополнительная колонка при включённом локальном фильтре по ключевым словам
+MATCHED_KEYWORDS_HEADER = "Совпавшие_слова"
+
+# Лимит строк листа Excel (1 048 576) минус строка заголовков
+EXCEL_MAX_ROWS = 1048575
+
+# Ширина колонок при потоковой записи: строки заранее неизвестны, поэтому фиксированная
+STREAM_COLUMN_WIDTHS = [14, 30, 18, 20, 50, 8, 8, 12, 40, 50, 30]
+
+
+def _headers_for(posts: List[Dict]) -> List[str]:
+    """Заголовки листа: базовые + колонка совпавших слов, если посты прошли фильтр"""
+    if any('matched_keywords' in post for post in posts):
+        return HEADERS + [ATTACHMENTS_HEADER, MATCHED_KEYWORDS_HEADER]
+    return HEADERS + [ATTACHMENTS_HEADER]
+
+
+def _format_attachments(attachments: List[Dict]) -> str:
+    """Вложения одной строкой: «photo https://…; video https://… «Название»»"""
+    parts = []
+    for attachment in attachments:
+        part = " ".join(filter(None, [attachment['type'], attachment.get('url')]))
+        if attachment.get('title'):
+            part += f" «{attachment['title']}»"
+        parts.append(part)
+    text = "; ".join(parts)
+    return text[:32760] + "..." if len(text) > 32767 else text
+
+
+def _prepare_row(post: Dict, full_text_dir: Path, log: Callable[[str, str], None],
+                 with_keywords: bool = False) -> list:
+    """Строка Excel для поста; длинный текст сохраняется в отдельный файл"""
+    # Обработка текста
+    full_text = post['text']
+    text_display = full_text[:32760] + "..." if len(full_text) > 32767 else full_text
+
+    # Если текст длинный — сохраняем в отдельный файл
+    if len(full_text) > 32767:
+        safe_filename = f"пост_{post['group_id']}_{post['post_id'].replace('/', '_')}.txt"
+        file_path = full_text_dir / safe_filename
+        try:
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(full_text)
+            text_display += f" [полный текст в файле: {safe_filename}]"
+            log("warning", f"Текст поста {post['post_id']} сохранён в файл: {safe_filename}")
+        except Exception as e:
+            log("error", f"Ошибка сохранения полного текста: {e}")
+            text_display += " [ошибка сохранения полного текста]"
+
+    # Конвертация даты для Excel (удаление временной зоны)
+    post_date = post['date']
+    if hasattr(post_date, 'tzinfo') and post_date.tzinfo is not None:
+        # Конвертируем в локальное время без tzinfo (для корректного отображения в Excel)
+        date_for_excel = post_date.replace(tzinfo=None)
+    else:
+        date_for_excel = post_date
+
+    row = [
+        post['group_id'],
+        post['group_name'],
+        post['post_id'],
+        date_for_excel,  # ← ИСПРАВЛЕНО: дата без tzinfo
+        text_display,
+        post['likes'],
+        post['reposts'],
+        post['comments'],
+        post['post_url'],
+        _format_attachments(post.get('attachments', []))
+    ]
+    if with_keywords:
+        row.append(post.get('matched_keywords', ''))
+    return row
+
+
+def _fill_sheet(ws, posts: List[Dict], full_text_dir: Path, log: Callable[[str, str], None]):
+    """Заполнение листа: заголовки, строки постов, ширина колонок"""
+    headers = _headers_for(posts)
+    with_keywords = MATCHED_KEYWORDS_HEADER in headers
+    ws.append(headers)
+
+    # Стили
+    header_font = Font(bold=True)
+    border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                    top=Side(style='thin'), bottom=Side(style='thin'))
+
+    # Применяем стили к заголовкам
+    for col_idx, _ in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col_idx)
+        cell.font = header_font
+        cell.border = border
+
+    # Данные (ширину колонок считаем сразу, без повторного обхода листа)
+    max_lengths = [len(header) for header in headers]
+    for post in posts:
+        row = _prepare_row(post, full_text_dir, log, with_keywords)
+        ws.append(row)
+        for col_idx, value in enumerate(row):
+            if value:
+                max_lengths[col_idx] = max(max_lengths[col_idx], len(str(value)))
+
+    # Автоматическая подстройка ширины колонок
+    for col_idx, max_length in enumerate(max_lengths, 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, 50)  # Ограничение на 50 символов
+
+
+def _build_shard_file(path: str, posts: List[Dict], full_text_dir: str) -> tuple:
+    """Сборка файла-шарда в дочернем процессе. Возвращает (путь, число постов, сообщения лога)"""
+    messages = []
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Посты"
+    _fill_sheet(ws, posts, Path(full_text_dir), lambda level, msg: messages.append((level, msg)))
+    wb.save(path)
+    return path, len(posts), messages
+
 
 class ExcelExporter:
-    def __init__(self, output_dir: str, logger):
+    def __init__(
+            self,
+            output_dir: str,
+            logger,
+            profiler=None,
+            shard_by: Optional[str] = None,
+            rows_per_shard: int = 100000,
+            shard_target: str = "files",
+            workers: Optional[int] = None
+    ):
         self.output_dir = output_dir
         self.logger = logger
+        self.profiler = profiler  # RunProfiler или None (профилирование выключено)
+        self.shard_by = shard_by  # None — один лист, "group" — по группам, "rows" — по числу строк
+        self.rows_per_shard = min(rows_per_shard, EXCEL_MAX_ROWS)
+        self.shard_target = shard_target  # "files" — отдельные книги, "sheets" — листы одной книги
+        self.workers = workers
         self.full_text_dir = Path(output_dir) / "полные_тексты"
         self.full_text_dir.mkdir(exist_ok=True)
 
-    def export_posts(self, posts: List[Dict]):
-        """Экспорт постов в Excel с обработкой длинных текстов и конвертацией дат"""
-        # Генерируем имя файла с датой
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        excel_path = Path(self.output_dir) / f"отчёт_{timestamp}.xlsx"
+    def export_posts(self, posts: List[Dict], partial: bool = False):
+        """Экспорт постов в Excel с обработкой длинных текстов и конвертацией дат.
+
+        partial=True — сбор был остановлен: к имени файла добавляется «_частичный».
+        """
+        section = self.profiler.section("export_posts") if self.profiler else nullcontext()
+        with section:
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S") + ("_частичный" if partial else "")
+            shard_by = self.shard_by
+            if not shard_by and len(posts) > EXCEL_MAX_ROWS:
+                self.logger.warning(f"{len(posts)} постов не помещаются на один лист Excel — экспорт по частям")
+                shard_by = "rows"
+            if shard_by:
+                return self._write_sharded(posts, shard_by, stamp)
+            return self._write_workbook(posts, stamp)
+
+    def open_stream(self, with_keywords: bool = False) -> "PostsStreamWriter":
+        """Потоковая запись постов по мере сбора (режим shard_by=None / "rows", в файлы)"""
+        if self.shard_by not in (None, "rows") or self.shard_target != "files":
+            raise ValueError("Потоковая запись поддерживает только разбиение по строкам в отдельные файлы")
+        return PostsStreamWriter(self, with_keywords)
+
+    def _log(self, level: str, msg: str):
+        getattr(self.logger, level)(msg)
+
+    def _write_workbook(self, posts: List[Dict], stamp: str):
+        """Формирование и сохранение книги Excel"""
+        # Имя файла с датой (stamp)
+        excel_path = Path(self.output_dir) / f"отчёт_{stamp}.xlsx"
 
         # Создаём книгу Excel
         wb = openpyxl.Workbook()
         ws = wb.active
         ws.title = "Посты"
-
-        # Заголовки
-        headers = [
-            "Группа_ID", "Группа_название", "Пост_ID", "Дата_публикации",
-            "Текст_полный", "Лайки", "Репосты", "Комментарии", "Ссылка_на_пост"
-        ]
-        ws.append(headers)
-
-        # Стили
-        header_font = Font(bold=True)
-        border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                        top=Side(style='thin'), bottom=Side(style='thin'))
-
-        # Применяем стили к заголовкам
-        for col_idx, _ in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_idx)
-            cell.font = header_font
-            cell.border = border
-
-        # Данные
-        for post in posts:
-            # Обработка текста
-            full_text = post['text']
-            text_display = full_text[:32760] + "..." if len(full_text) > 32767 else full_text
-
-            # Если текст длинный — сохраняем в отдельный файл
-            if len(full_text) > 32767:
-                safe_filename = f"пост_{post['group_id']}_{post['post_id'].replace('/', '_')}.txt"
-                file_path = self.full_text_dir / safe_filename
-                try:
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        f.write(full_text)
-                    text_display += f" [полный текст в файле: {safe_filename}]"
-                    self.logger.warning(f"Текст поста {post['post_id']} сохранён в файл: {safe_filename}")
-                except Exception as e:
-                    self.logger.error(f"Ошибка сохранения полного текста: {e}")
-                    text_display += " [ошибка сохранения полного текста]"
-
-            # Конвертация даты для Excel (удаление временной зоны)
-            post_date = post['date']
-            if hasattr(post_date, 'tzinfo') and post_date.tzinfo is not None:
-                # Конвертируем в локальное время без tzinfo (для корректного отображения в Excel)
-                date_for_excel = post_date.replace(tzinfo=None)
-            else:
-                date_for_excel = post_date
-
-            # Добавляем строку в Excel
-            row = [
-                post['group_id'],
-                post['group_name'],
-                post['post_id'],
-                date_for_excel,  # ← ИСПРАВЛЕНО: дата без tzinfo
-                text_display,
-                post['likes'],
-                post['reposts'],
-                post['comments'],
-                post['post_url']
-            ]
-            ws.append(row)
-
-        # Автоматическая подстройка ширины колонок
-        for col_idx, header in enumerate(headers, 1):
-            max_length = len(header)
-            col = get_column_letter(col_idx)
-            for row in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=col_idx, max_col=col_idx):
-                if row[0].value:
-                    max_length = max(max_length, len(str(row[0].value)))
-            adjusted_width = min(max_length + 2, 50)  # Ограничение на 50 символов
-            ws.column_dimensions[col].width = adjusted_width
+        _fill_sheet(ws, posts, self.full_text_dir, self._log)
 
         # Сохраняем файл
         try:
@@ -102,4 +199,230 @@ class ExcelExporter:
             return excel_path
         except Exception as e:
             self.logger.error(f"Ошибка сохранения Excel-файла: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def _split_shards(self, posts: List[Dict], shard_by: str) -> List[tuple]:
+        """Разбиение постов на шарды: [(метка, посты), ...]"""
+        shards = []
+        if shard_by == "group":
+            by_group = {}
+            for post in posts:
+                by_group.setdefault(post['group_id'], []).append(post)
+            for group_id, group_posts in by_group.items():
+                # Крупная группа всё равно режется по лимиту строк
+                for start in range(0, len(group_posts), self.rows_per_shard):
+                    shards.append((str(group_id), group_posts[start:start + self.rows_per_shard]))
+        elif shard_by == "rows":
+            for start in range(0, len(posts), self.rows_per_shard):
+                shards.append((f"строки_{start + 1}", posts[start:start + self.rows_per_shard]))
+        else:
+            raise ValueError(f"Неизвестный режим разбиения экспорта: {shard_by}")
+        return shards
+
+    def _write_sharded(self, posts: List[Dict], shard_by: str, stamp: str):
+        """Экспорт по частям с книгой-оглавлением"""
+        shards = self._split_shards(posts, shard_by)
+        self.logger.info(f"Экспорт {len(posts)} постов в {len(shards)} частей ({shard_by}, {self.shard_target})")
+
+        if self.shard_target == "sheets":
+            return self._write_sharded_sheets(shards, stamp)
+
+        # Каждый шард — отдельная книга, собирается в своём процессе
+        jobs = []
+        for idx, (label, shard_posts) in enumerate(shards, 1):
+            path = Path(self.output_dir) / f"отчёт_{stamp}_часть_{idx:03d}_{label}.xlsx"
+            jobs.append((str(path), label, shard_posts))
+
+        results = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                (label, pool.submit(_build_shard_file, path, shard_posts, str(self.full_text_dir)))
+                for path, label, shard_posts in jobs
+            ]
+            for label, future in futures:
+                path, count, messages = future.result()
+                for level, msg in messages:
+                    self._log(level, msg)
+                results.append((label, Path(path), count))
+        return self._write_index(results, stamp)
+
+    def _write_index(self, results: List[tuple], stamp: str):
+        """Книга-оглавление со ссылками на файлы частей: results — [(метка, путь, постов), ...]"""
+        index_path = Path(self.output_dir) / f"отчёт_{stamp}_оглавление.xlsx"
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "Оглавление"
+        ws.append(["Часть", "Постов", "Файл"])
+        for label, path, count in results:
+            ws.append([label, count, path.name])
+            cell = ws.cell(row=ws.max_row, column=3)
+            cell.hyperlink = path.name  # Относительная ссылка — работает при переносе папки
+            cell.style = "Hyperlink"
+        self._style_index(ws)
+
+        try:
+            wb.save(index_path)
+            self.logger.success(f"✅ Экспорт завершён: {len(results)} файлов, оглавление: {index_path}")
+            return index_path
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения Excel-файла: {e}")
+            raise
+
+    def _write_sharded_sheets(self, shards: List[tuple], stamp: str):
+        """Шарды — листы одной книги (openpyxl не умеет собирать книгу из частей, поэтому последовательно)"""
+        excel_path = Path(self.output_dir) / f"отчёт_{stamp}.xlsx"
+        wb = openpyxl.Workbook()
+        index_ws = wb.active
+        index_ws.title = "Оглавление"
+        index_ws.append(["Часть", "Постов", "Лист"])
+
+        for idx, (label, shard_posts) in enumerate(shards, 1):
+            # Имя листа: до 31 символа, без запрещённых символов
+            sheet_name = f"{idx:03d}_{label}"[:31]
+            for ch in '[]:*?/\\':
+                sheet_name = sheet_name.replace(ch, "_")
+            ws = wb.create_sheet(sheet_name)
+            _fill_sheet(ws, shard_posts, self.full_text_dir, self._log)
+
+            index_ws.append([label, len(shard_posts), sheet_name])
+            cell = index_ws.cell(row=index_ws.max_row, column=3)
+            cell.hyperlink = f"#'{sheet_name}'!A1"
+            cell.style = "Hyperlink"
+        self._style_index(index_ws)
+
+        try:
+            wb.save(excel_path)
+            self.logger.success(f"✅ Экспорт завершён: {excel_path} ({len(shards)} листов)")
+            return excel_path
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения Excel-файла: {e}")
+            raise
+
+    @staticmethod
+    def _style_index(ws):
+        """Оформление листа-оглавления"""
+        for cell in ws[1]:
+            cell.font = Font(bold=True)
+        ws.column_dimensions["A"].width = 25
+        ws.column_dimensions["B"].width = 10
+        ws.column_dimensions["C"].width = 50
+
+
+class PostsStreamWriter:
+    """
+    Потоковая запись постов (write-only режим openpyxl).
+
+    Строки пишутся сразу, без накопления постов в памяти. При достижении
+    лимита строк начинается новая часть; если частей несколько, при закрытии
+    создаётся книга-оглавление, как при обычном экспорте по частям.
+    """
+
+    def __init__(self, exporter: ExcelExporter, with_keywords: bool = False):
+        self.exporter = exporter
+        self.headers = HEADERS + [ATTACHMENTS_HEADER] + ([MATCHED_KEYWORDS_HEADER] if with_keywords else [])
+        self.with_keywords = with_keywords
+        self.rows_limit = exporter.rows_per_shard if exporter.shard_by == "rows" else EXCEL_MAX_ROWS
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.parts = []  # [(путь, первая строка, постов)]
+        self.count = 0
+        self._wb = None
+        self._ws = None
+        self._rows = 0
+
+    def _open_part(self):
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Посты")
+        # В write-only режиме ширину колонок задают до первой строки
+        for col_idx, width in enumerate(STREAM_COLUMN_WIDTHS[:len(self.headers)], 1):
+            self._ws.column_dimensions[get_column_letter(col_idx)].width = width
+        header_cells = []
+        for header in self.headers:
+            cell = WriteOnlyCell(self._ws, value=header)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        self._ws.append(header_cells)
+        self._rows = 0
+
+    def _close_part(self):
+        path = Path(self.exporter.output_dir) / f"отчёт_{self.timestamp}_часть_{len(self.parts) + 1:03d}.xlsx"
+        self._wb.save(path)
+        self.parts.append((path, self.count - self._rows + 1, self._rows))
+        self._wb = self._ws = None
+
+    def write(self, posts: List[Dict]):
+        """Дописывание пачки постов"""
+        for post in posts:
+            if self._wb is None:
+                self._open_part()
+            self._ws.append(_prepare_row(post, self.exporter.full_text_dir, self.exporter._log, self.with_keywords))
+            self._rows += 1
+            self.count += 1
+            if self._rows >= self.rows_limit:
+                self._close_part()
+
+    def close(self, partial: bool = False):
+        """Сохранение последней части; возвращает путь к отчёту (или оглавлению), None — постов не было"""
+        try:
+            if self._wb is not None:
+                self._close_part()
+            if not self.parts:
+                return None
+
+            stamp = self.timestamp + ("_частичный" if partial else "")
+            output_dir = Path(self.exporter.output_dir)
+            if len(self.parts) == 1:
+                excel_path = self.parts[0][0].rename(output_dir / f"отчёт_{stamp}.xlsx")
+                self.exporter.logger.success(f"✅ Экспорт завершён: {excel_path}")
+                return excel_path
+
+            results = []
+            for idx, (path, start, count) in enumerate(self.parts, 1):
+                label = f"строки_{start}"
+                final_path = path.rename(output_dir / f"отчёт_{stamp}_часть_{idx:03d}_{label}.xlsx")
+                results.append((label, final_path, count))
+            return self.exporter._write_index(results, stamp)
+        except Exception as e:
+            self.exporter.logger.error(f"Ошибка сохранения Excel-файла: {e}")
+            raise
+
+
+class CommentsWriter:
+    """Потоковая запись комментариев в отдельную книгу (write-only режим openpyxl)"""
+
+    HEADERS = ["Пост_ID", "Комментарий_ID", "Ответ_на", "Автор_ID", "Дата", "Текст", "Лайки"]
+
+    def __init__(self, output_dir: str, logger):
+        self.logger = logger
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = Path(output_dir) / f"комментарии_{timestamp}.xlsx"
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Комментарии")
+        self.ws.append(self.HEADERS)
+        self.count = 0
+
+    def write(self, comments: List[Dict]):
+        """Дописывание пачки комментариев"""
+        for comment in comments:
+            text = comment['text']
+            if len(text) > 32767:
+                text = text[:32760] + "..."
+            self.ws.append([
+                comment['post_id'],
+                comment['comment_id'],
+                comment['parent_id'],
+                comment['from_id'],
+                comment['date'].replace(tzinfo=None),
+                text,
+                comment['likes']
+            ])
+        self.count += len(comments)
+
+    def close(self):
+        """Сохранение книги"""
+        try:
+            self.wb.save(self.path)
+            self.logger.success(f"✅ Сохранено {self.count} комментариев: {self.path}")
+            return self.path
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения комментариев: {e}")
+            raise
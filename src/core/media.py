@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""Скачивание медиафайлов из вложений собранных постов"""
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, List
+from urllib.parse import urlparse
+
+import requests
+
+from .transport import ResilientTransport, RetryPolicy, build_session
+
+
+class MediaRetryPolicy(RetryPolicy):
+    """Повторы скачивания: кроме сетевых ошибок — 429/5xx файлового хоста и оборванная передача"""
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        if isinstance(error, requests.exceptions.ChunkedEncodingError):
+            return True
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and (
+                error.response.status_code == 429 or error.response.status_code >= 500
+            )
+        return RetryPolicy.is_retryable(error)
+
+
+class MediaDownloader:
+    """
+    Параллельное скачивание фото и документов из вложений постов.
+
+    - пул из `workers` потоков поверх одной keep-alive сессии;
+    - файл называется по SHA-256 содержимого, поэтому картинка, которую
+      репостнули десять групп, хранится один раз;
+    - недокачанный файл остаётся в папке .part и при следующем запуске
+      докачивается запросом Range;
+    - скачанные ссылки записываются в manifest.tsv и повторно не запрашиваются.
+    """
+
+    DOWNLOADABLE = ("photo", "doc")
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, output_dir: str, logger, workers: int = 4, should_stop: Callable[[], bool] = lambda: False):
+        self.logger = logger
+        self.workers = max(1, workers)
+        self.should_stop = should_stop
+        self.media_dir = Path(output_dir) / "медиа"
+        self.parts_dir = self.media_dir / ".part"
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.media_dir / "manifest.tsv"
+        self.session = build_session(pool_size=self.workers)
+        self.transport = ResilientTransport(retry_policy=MediaRetryPolicy())
+        self._manifest = self._load_manifest()  # {ссылка: имя файла}
+        self._lock = threading.Lock()
+
+    def _load_manifest(self) -> Dict[str, str]:
+        manifest = {}
+        if self.manifest_path.exists():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    url, _, name = line.rstrip("\n").partition("\t")
+                    if name:
+                        manifest[url] = name
+        return manifest
+
+    def download(self, posts: List[Dict]) -> Dict[str, int]:
+        """Скачивание вложений постов; возвращает статистику по ссылкам"""
+        attachments = {}
+        for post in posts:
+            for attachment in post.get('attachments', []):
+                if attachment['type'] in self.DOWNLOADABLE and attachment.get('url'):
+                    attachments.setdefault(attachment['url'], attachment)
+
+        pending = [
+            url for url in attachments
+            if url not in self._manifest or not (self.media_dir / self._manifest[url]).exists()
+        ]
+        stats = {"downloaded": 0, "duplicates": 0, "failed": 0, "skipped": len(attachments) - len(pending)}
+        self.logger.info(f"Медиа: {len(attachments)} файлов во вложениях, к скачиванию {len(pending)}")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="media") as pool:
+            futures = {pool.submit(self._fetch, url, attachments[url]): url for url in pending}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    self.logger.warning(f"Не удалось скачать {futures[future]}: {e}")
+                    continue
+                if result is None:
+                    stats["skipped"] += 1  # Остановлено пользователем
+                elif result:
+                    stats["duplicates"] += 1
+                else:
+                    stats["downloaded"] += 1
+
+        self.logger.success(
+            f"✅ Медиа: скачано {stats['downloaded']}, совпали с уже сохранёнными {stats['duplicates']}, "
+            f"ошибок {stats['failed']} — {self.media_dir}"
+        )
+        return stats
+
+    def _fetch(self, url: str, attachment: Dict):
+        """Скачивание одного файла. Возвращает True — дубликат, False — новый файл, None — пропущен"""
+        if self.should_stop():
+            return None
+        part_path = self.parts_dir / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".part")
+        # Повторы с докачкой с места обрыва. Circuit breaker — на файл, а не на хост: один CDN
+        # отдаёт все картинки, и несколько сбойных файлов не должны останавливать остальные
+        self.transport.call(url, lambda: self._download_to(url, part_path))
+
+        digest = hashlib.sha256()
+        with open(part_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b""):
+                digest.update(chunk)
+        ext = attachment.get('ext') or PurePosixPath(urlparse(url).path).suffix.lstrip(".") or "bin"
+        name = f"{digest.hexdigest()[:32]}.{ext}"
+        final_path = self.media_dir / name
+
+        duplicate = final_path.exists()
+        if duplicate:
+            part_path.unlink()
+        else:
+            part_path.replace(final_path)
+
+        with self._lock:
+            self._manifest[url] = name
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(f"{url}\t{name}\n")
+        return duplicate
+
+    def _download_to(self, url: str, part_path: Path):
+        """Скачивание в .part-файл с продолжением по Range, если он уже есть"""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with self.session.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 416:
+                return  # Файл уже докачан целиком
+            response.raise_for_status()
+            # Сервер может проигнорировать Range и отдать файл целиком
+            mode = "ab" if response.status_code == 206 else "wb"
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(self.CHUNK_SIZE):
+                    f.write(chunk)
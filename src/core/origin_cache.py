@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Кэш оригиналов репостов (в памяти + на диске), общий для всех групп запуска"""
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+
+class OriginCache:
+    """
+    Нормализованные тексты оригинальных постов по ключу owner_id_post_id.
+
+    Если много групп репостят один и тот же пост, он запрашивается и
+    очищается один раз. При указании `path` кэш сохраняется в SQLite и
+    переживает перезапуски. В памяти держатся не больше `max_memory`
+    последних использованных текстов (LRU), остальные читаются из SQLite.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_memory: int = 50000):
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self.max_memory = max_memory
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS origins (key TEXT PRIMARY KEY, text TEXT NOT NULL)")
+            self._db.commit()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT text FROM origins WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remember({key: row[0]})
+                return row[0]
+            return None
+
+    def _remember(self, items: Dict[str, str]):
+        """Добавление в память с вытеснением давно не использованных (вызывается под блокировкой)"""
+        for key, text in items.items():
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def missing(self, keys: Iterable[str]) -> list:
+        """Ключи, которых нет в кэше"""
+        return [key for key in dict.fromkeys(keys) if self.get(key) is None]
+
+    def put_many(self, items: Dict[str, str]):
+        if not items:
+            return
+        with self._lock:
+            self._remember(items)
+            if self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO origins (key, text) VALUES (?, ?)", items.items())
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
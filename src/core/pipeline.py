@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Конвейер «сбор → запись»: экспорт параллельно со сбором"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List
+
+
+class ExportPipeline:
+    """
+    Ограниченная очередь между потоками сбора и единственным потоком записи.
+
+    Потоки сбора передают посты через put() и сразу возвращаются к сети,
+    поток записи дописывает их в выгрузку. Когда запись отстаёт и очередь
+    заполнена, put() блокируется — сбор притормаживает, а в памяти лежит
+    не больше `max_batches` пачек по `batch_size` постов.
+    """
+
+    _DONE = object()
+
+    def __init__(self, write: Callable[[List[Dict]], None], max_batches: int = 8, batch_size: int = 500):
+        self.write = write
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_batches)
+        self.error = None
+        self.busy_time = 0.0  # Сколько поток записи действительно писал (для сравнения со временем сбора)
+        self.logger = logging.getLogger(__name__)
+        self._thread = threading.Thread(target=self._run, name="export-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, posts: List[Dict]):
+        """Передача постов на запись (блокируется, пока очередь заполнена)"""
+        for start in range(0, len(posts), self.batch_size):
+            self._raise_if_failed()
+            self.queue.put(posts[start:start + self.batch_size])
+
+    def close(self):
+        """Дождаться записи всех переданных постов"""
+        self.queue.put(self._DONE)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is self._DONE:
+                return
+            if self.error is not None:
+                continue  # После ошибки только разбираем очередь, чтобы не блокировать сбор
+            started = time.perf_counter()
+            try:
+                self.write(batch)
+            except Exception as e:
+                self.logger.error(f"Ошибка записи выгрузки: {e}")
+                self.error = e
+            self.busy_time += time.perf_counter() - started
+
+    def _raise_if_failed(self):
+        if self.error is not None:
+            raise Exception(f"Ошибка записи выгрузки: {self.error}")
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Режим непрерывного опроса групп с адаптивными интервалами"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+
+class GroupPollState:
+    """Состояние опроса одной группы (сохраняется в конфиг между запусками)"""
+
+    def __init__(self, group: str, last_post_id: int = 0, last_poll: float = 0.0,
+                 interval: float = 0.0, rate: float = 0.0):
+        self.group = group
+        self.last_post_id = last_post_id  # ID самого свежего собранного поста
+        self.last_poll = last_poll        # Unix-время последнего опроса
+        self.interval = interval          # Текущий интервал опроса, сек
+        self.rate = rate                  # Сглаженная частота публикаций, постов/сек
+
+    @classmethod
+    def from_dict(cls, group: str, data: dict) -> "GroupPollState":
+        return cls(
+            group,
+            last_post_id=int(data.get("last_post_id", 0)),
+            last_poll=float(data.get("last_poll", 0.0)),
+            interval=float(data.get("interval", 0.0)),
+            rate=float(data.get("rate", 0.0))
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "last_post_id": self.last_post_id,
+            "last_poll": self.last_poll,
+            "interval": round(self.interval, 1),
+            "rate": self.rate
+        }
+
+    @property
+    def next_due(self) -> float:
+        return self.last_poll + self.interval
+
+
+class GroupPoller:
+    """
+    Долгоживущий опрос групп: у каждой группы своё расписание.
+
+    Интервал подстраивается под наблюдаемую частоту публикаций так, чтобы за
+    один опрос приходило около `target_posts_per_poll` постов: активные группы
+    опрашиваются раз в несколько минут, «спящие» — раз в сутки. Каждый опрос
+    забирает только посты новее последнего собранного ID.
+    """
+
+    def __init__(
+            self,
+            client,
+            groups: List[str],
+            on_posts: Callable[[list], None],
+            state: Optional[Dict[str, dict]] = None,
+            on_state_change: Callable[[Dict[str, dict]], None] = lambda state: None,
+            min_interval: float = 300.0,
+            max_interval: float = 86400.0,
+            target_posts_per_poll: float = 20.0,
+            initial_days: int = 1,
+            smoothing: float = 0.3
+    ):
+        self.client = client
+        self.on_posts = on_posts
+        self.on_state_change = on_state_change
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_posts_per_poll = target_posts_per_poll
+        self.initial_days = initial_days
+        self.smoothing = smoothing
+        self.logger = logging.getLogger(__name__)
+        self._stop_event = threading.Event()
+
+        state = state or {}
+        self.states = {
+            group: GroupPollState.from_dict(group, state.get(group, {}))
+            for group in dict.fromkeys(groups)
+        }
+
+    def stop(self):
+        """Остановка опроса (можно вызывать из другого потока)"""
+        self._stop_event.set()
+
+    def next_interval(self, state: GroupPollState, new_posts: int, elapsed: float) -> float:
+        """Пересчёт интервала опроса по числу новых постов за прошедшее время"""
+        if elapsed > 0:
+            observed_rate = new_posts / elapsed
+            if state.rate > 0:
+                state.rate = self.smoothing * observed_rate + (1 - self.smoothing) * state.rate
+            else:
+                state.rate = observed_rate
+
+        if new_posts == 0:
+            # Новых постов нет — постепенно реже, не дожидаясь пока сгладится частота
+            interval = max(state.interval, self.min_interval) * 2
+        elif state.rate > 0:
+            interval = self.target_posts_per_poll / state.rate
+        else:
+            interval = self.min_interval
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def poll_group(self, state: GroupPollState) -> list:
+        """Один опрос группы: только новые посты"""
+        now = time.time()
+        if state.last_poll:
+            since = datetime.fromtimestamp(state.last_poll, tz=timezone.utc) - timedelta(days=1)
+        else:
+            since = datetime.now(timezone.utc) - timedelta(days=self.initial_days)
+        today = datetime.now(timezone.utc).date()
+
+        posts = self.client.get_posts_from_group(
+            group_id=state.group,
+            date_from=since.date(),
+            date_to=today,
+            after_post_id=state.last_post_id
+        )
+
+        if posts:
+            state.last_post_id = max(int(p['post_id'].rsplit('_', 1)[-1]) for p in posts)
+        elapsed = now - state.last_poll if state.last_poll else self.initial_days * 86400
+        state.interval = self.next_interval(state, len(posts), elapsed)
+        state.last_poll = now
+        return posts
+
+    def run_once(self) -> int:
+        """Опрос всех групп, у которых подошло время. Возвращает число новых постов"""
+        now = time.time()
+        due = [s for s in self.states.values() if s.next_due <= now]
+        new_posts = []
+        polled = []  # (состояние, его значения до опроса) — для отката, если посты не удалось сохранить
+        for state in due:
+            if self._stop_event.is_set():
+                break
+            previous = (state.last_post_id, state.last_poll, state.rate)
+            try:
+                posts = self.poll_group(state)
+            except Exception as e:
+                self.logger.error(f"Ошибка опроса группы {state.group}: {e}")
+                # Повторим не раньше минимального интервала, чтобы не устроить шквал запросов
+                state.last_poll = time.time()
+                state.interval = max(state.interval, self.min_interval)
+                continue
+            self.logger.info(
+                f"Группа {state.group}: новых постов {len(posts)}, "
+                f"следующий опрос через {state.interval / 60:.0f} мин"
+            )
+            if posts:
+                polled.append((state, previous))
+            new_posts.extend(posts)
+
+        if new_posts:
+            try:
+                self.on_posts(new_posts)
+            except Exception as e:
+                # Ошибка экспорта или индекса не должна останавливать долгоживущий опрос. Отметку
+                # последнего поста откатываем и состояние не сохраняем — посты будут запрошены снова
+                self.logger.error(f"Ошибка обработки {len(new_posts)} новых постов, повтор через "
+                                  f"{self.min_interval / 60:.0f} мин: {e}")
+                retry_at = time.time() + self.min_interval
+                for state, (last_post_id, last_poll, rate) in polled:
+                    state.last_post_id, state.last_poll, state.rate = last_post_id, last_poll, rate
+                    state.interval = retry_at - last_poll
+                return 0
+        if due:
+            self.on_state_change({g: s.to_dict() for g, s in self.states.items()})
+        return len(new_posts)
+
+    def run_forever(self):
+        """Основной цикл опроса до вызова stop()"""
+        self.logger.info(f"Запущен опрос {len(self.states)} групп")
+        while not self._stop_event.is_set():
+            self.run_once()
+            if not self.states:
+                break
+            next_due = min(s.next_due for s in self.states.values())
+            self._stop_event.wait(max(next_due - time.time(), 1.0))
+        self.logger.info("Опрос групп остановлен")
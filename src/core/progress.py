@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""События прогресса сбора: постраничные отчёты, скорость и оценка времени"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date as date_type, datetime, timezone
+from typing import Callable, Dict, Optional
+
+
+@dataclass
+class PageProgress:
+    """Событие после каждой обработанной страницы выдачи"""
+    group: str
+    pages: int
+    accepted: int  # Постов принято в выгрузку (нарастающим итогом)
+    skipped: int  # Постов пропущено: закреплённые, вне периода
+    oldest_date: Optional[datetime]  # Самая старая дата, до которой дошёл обход
+    requests_per_sec: float
+
+
+@dataclass
+class ProgressSnapshot:
+    """Сводное состояние запуска для отображения"""
+    fraction: float  # 0..1
+    groups_done: int
+    total_groups: int
+    posts: int
+    requests_per_sec: float
+    eta: Optional[float]  # Секунд до окончания, None — пока нельзя оценить
+    current: Optional[PageProgress] = None
+
+    def describe(self) -> str:
+        """Строка для метки прогресса"""
+        parts = [f"Группы {self.groups_done}/{self.total_groups}", f"постов {self.posts}"]
+        if self.requests_per_sec:
+            parts.append(f"{self.requests_per_sec:.1f} запр/с")
+        if self.eta is not None:
+            parts.append(f"осталось ~{_format_duration(self.eta)}")
+        text = " · ".join(parts)
+        if self.current:
+            reached = f", до {self.current.oldest_date:%d.%m.%Y}" if self.current.oldest_date else ""
+            text += f"\n{self.current.group}: стр. {self.current.pages}{reached}"
+        return text
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds} сек"
+    if seconds < 3600:
+        return f"{seconds // 60} мин"
+    return f"{seconds // 3600} ч {seconds % 3600 // 60} мин"
+
+
+class ProgressTracker:
+    """
+    Сводный прогресс запуска по постраничным событиям VKClient.
+
+    Доля выполнения незавершённой группы — большее из пройденной части
+    периода (по дате самого старого поста) и доли лимита постов. Сводка
+    передаётся в `emit` не чаще раза в `min_interval` секунд, чтобы не
+    заваливать очередь событий Tk (последнее завершение — всегда).
+    """
+
+    def __init__(
+            self,
+            limits: Dict[str, int],
+            date_from: date_type,
+            date_to: date_type,
+            emit: Callable[[ProgressSnapshot], None],
+            min_interval: float = 0.5
+    ):
+        self.limits = limits  # {группа: лимит постов}
+        self.total = len(limits)
+        self.ts_from = datetime.combine(date_from, datetime.min.time(), tzinfo=timezone.utc).timestamp()
+        self.ts_to = datetime.combine(date_to, datetime.max.time(), tzinfo=timezone.utc).timestamp()
+        self.emit = emit
+        self.min_interval = min_interval
+        self.started = time.monotonic()
+        self.groups_done = 0
+        self.posts_done = 0
+        self._active: Dict[str, PageProgress] = {}
+        self._last: Optional[PageProgress] = None
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+
+    def page(self, event: PageProgress):
+        """Обработчик событий страниц (можно передать в VKClient как on_progress)"""
+        with self._lock:
+            self._active[event.group] = event
+            self._last = event
+            snapshot = self._snapshot_if_due(force=False)
+        if snapshot:
+            self.emit(snapshot)
+
+    def group_done(self, group: str, posts_count: int):
+        """Группа завершена (с ошибкой или без)"""
+        with self._lock:
+            self._active.pop(group, None)
+            self.groups_done += 1
+            self.posts_done += posts_count
+            snapshot = self._snapshot_if_due(force=self.groups_done >= self.total)
+        if snapshot:
+            self.emit(snapshot)
+
+    def _group_fraction(self, event: PageProgress) -> float:
+        by_date = 0.0
+        if event.oldest_date and self.ts_to > self.ts_from:
+            by_date = (self.ts_to - event.oldest_date.timestamp()) / (self.ts_to - self.ts_from)
+        limit = self.limits.get(event.group, 0)
+        by_limit = event.accepted / limit if limit else 0.0
+        return min(max(by_date, by_limit, 0.0), 1.0)
+
+    def _snapshot_if_due(self, force: bool) -> Optional[ProgressSnapshot]:
+        now = time.monotonic()
+        if not force and now - self._last_emit < self.min_interval:
+            return None
+        self._last_emit = now
+
+        partial = sum(self._group_fraction(e) for e in self._active.values())
+        fraction = min((self.groups_done + partial) / self.total, 1.0) if self.total else 1.0
+        elapsed = now - self.started
+        eta = elapsed * (1 - fraction) / fraction if fraction > 0.01 else None
+        return ProgressSnapshot(
+            fraction=fraction,
+            groups_done=self.groups_done,
+            total_groups=self.total,
+            posts=self.posts_done + sum(e.accepted for e in self._active.values()),
+            requests_per_sec=self._last.requests_per_sec if self._last else 0.0,
+            eta=eta,
+            current=self._last if self._last and self._last.group in self._active else None
+        )
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Обновление лайков, репостов и комментариев в ранее выгруженных отчётах"""
+from pathlib import Path
+from typing import List
+
+import openpyxl
+
+from .excel_exporter import HEADERS
+
+# Колонки счётчиков в отчёте и соответствующие ключи ответа VKClient.get_post_counters
+COUNTER_COLUMNS = {"Лайки": "likes", "Репосты": "reposts", "Комментарии": "comments"}
+
+
+class EngagementRefresher:
+    """
+    Обновление счётчиков в отчёте без повторного обхода стен.
+
+    Берёт Пост_ID из листов с постами, запрашивает текущие счётчики пакетно
+    (wall.getById в execute) и перезаписывает только изменившиеся ячейки.
+    Для отчёта, разбитого на файлы, можно передать книгу-оглавление —
+    обновятся все файлы, на которые она ссылается.
+    """
+
+    def __init__(self, client, logger):
+        self.client = client
+        self.logger = logger
+
+    def refresh(self, report_path: str) -> int:
+        """Обновление отчёта (или всех частей по оглавлению). Возвращает число изменённых ячеек"""
+        path = Path(report_path)
+        changed = 0
+        for workbook_path in self._workbook_paths(path):
+            changed += self.refresh_workbook(workbook_path)
+        return changed
+
+    def _workbook_paths(self, path: Path) -> List[Path]:
+        """Файл отчёта или файлы частей, перечисленные в оглавлении"""
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            if wb.sheetnames == ["Оглавление"]:
+                ws = wb["Оглавление"]
+                return [path.parent / row[2] for row in ws.iter_rows(min_row=2, values_only=True) if row[2]]
+            return [path]
+        finally:
+            wb.close()
+
+    def refresh_workbook(self, path: Path) -> int:
+        """Обновление счётчиков во всех листах с постами одной книги"""
+        wb = openpyxl.load_workbook(path)
+        sheets = [ws for ws in wb.worksheets if [c.value for c in ws[1]][:len(HEADERS)] == HEADERS]
+        if not sheets:
+            self.logger.warning(f"В файле {path.name} нет листов с постами")
+            return 0
+
+        post_id_col = HEADERS.index("Пост_ID")
+        counter_cols = {HEADERS.index(name): key for name, key in COUNTER_COLUMNS.items()}
+
+        post_ids = []
+        for ws in sheets:
+            for row in ws.iter_rows(min_row=2, min_col=post_id_col + 1, max_col=post_id_col + 1, values_only=True):
+                if row[0]:
+                    post_ids.append(str(row[0]))
+
+        self.logger.info(f"Запрашиваем счётчики для {len(post_ids)} постов из {path.name}...")
+        counters = self.client.get_post_counters(list(dict.fromkeys(post_ids)))
+
+        changed = 0
+        for ws in sheets:
+            for row in ws.iter_rows(min_row=2):
+                current = counters.get(str(row[post_id_col].value))
+                if not current:
+                    continue
+                for col_idx, key in counter_cols.items():
+                    if row[col_idx].value != current[key]:
+                        row[col_idx].value = current[key]
+                        changed += 1
+
+        if changed:
+            wb.save(path)
+        missing = len(set(post_ids)) - len(counters)
+        self.logger.success(
+            f"✅ {path.name}: обновлено {changed} значений"
+            + (f", недоступно постов: {missing}" if missing > 0 else "")
+        )
+        return changed
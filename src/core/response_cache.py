@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Дисковый кэш ответов VK API (запись / воспроизведение)"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+# Срок жизни ответов по умолчанию, секунд. Методы без записи не кэшируются
+DEFAULT_TTLS = {
+    "groups.getById": 7 * 86400,
+    "wall.get": 3600,
+    "wall.search": 3600,
+    "newsfeed.search": 3600,
+    "execute": 3600
+}
+
+
+class CacheMissError(Exception):
+    """В режиме воспроизведения запрошен ответ, которого нет в кэше"""
+
+
+class ResponseCache:
+    """
+    Сжатые ответы API в SQLite по ключу «метод + параметры».
+
+    - у каждого метода свой срок жизни (`ttls`), прочие методы не кэшируются;
+    - при превышении `max_bytes` удаляются давно не использованные ответы (LRU);
+    - `replay=True` — строгое воспроизведение: ответы берутся только из кэша
+      без учёта срока жизни, промах — CacheMissError. Так прогоны для отладки
+      и замеров повторяются без сети и дают одинаковый результат.
+    """
+
+    def __init__(
+            self,
+            path: Path,
+            ttls: Optional[Dict[str, float]] = None,
+            max_bytes: int = 500 * 1024 * 1024,
+            replay: bool = False
+    ):
+        self.ttls = dict(DEFAULT_TTLS) if ttls is None else ttls
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL,
+                data BLOB NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def handles(self, method: str) -> bool:
+        """Проходит ли метод через кэш"""
+        return self.replay or method in self.ttls
+
+    @staticmethod
+    def _key(method: str, params: dict) -> str:
+        payload = json.dumps([method, params], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, method: str, params: dict):
+        """Сохранённый ответ или None (в режиме воспроизведения промах — CacheMissError)"""
+        key = self._key(method, params)
+        with self._lock:
+            row = self._db.execute("SELECT created, data FROM responses WHERE key = ?", (key,)).fetchone()
+            fresh = row is not None and (self.replay or time.time() - row[0] <= self.ttls.get(method, 0))
+            if fresh:
+                self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+                self.hits += 1
+            else:
+                self.misses += 1
+        if fresh:
+            return json.loads(zlib.decompress(row[1]).decode("utf-8"))
+        if self.replay:
+            raise CacheMissError(f"Нет сохранённого ответа для {method} {params}")
+        return None
+
+    def put(self, method: str, params: dict, response):
+        """Сохранение ответа с вытеснением давно не использованных"""
+        if self.replay or response is None:
+            return
+        data = zlib.compress(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        key = self._key(method, params)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, method, created, accessed, size, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, method, now, now, len(data), data)
+            )
+            self._size += len(data) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        """Удаление самых давно использованных ответов до 90% лимита (вызывается под блокировкой)"""
+        target = self.max_bytes * 0.9
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
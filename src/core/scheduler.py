@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Планировщик сбора: разбиение больших списков групп на задания и их выполнение"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import date as date_type
+from typing import Callable, Dict, List, Optional
+
+from .transport import CollectionCancelled
+
+
+@dataclass
+class WorkUnit:
+    """Задание на сбор одной группы"""
+    group: str
+    max_posts: int
+    expected_posts: float = 0.0
+    last_collected: float = 0.0  # Unix-время последнего сбора, 0 — ни разу
+    group_info: Optional[tuple] = None  # (owner_id, group_name) после пакетного разрешения
+
+
+class JobScheduler:
+    """
+    Планировщик для произвольно больших списков групп.
+
+    - группы разрешаются пакетно (groups.getById по 500 штук) вместо 1–2 запросов на группу;
+    - задания сортируются: сначала ни разу не собранные, затем по ожидаемому
+      объёму (крупные раньше — они определяют общее время), затем по давности сбора;
+    - задания выполняются пулом потоков поверх одного VKClient. Запросы к ВК
+      всё равно идут по одному (общий рейт-лимит и блокировка соединения vk_api),
+      пул лишь совмещает запросы одной группы с разбором, фильтрацией и записью другой.
+    """
+
+    def __init__(
+            self,
+            client,
+            default_max_posts: int = 5000,
+            group_limits: Optional[Dict[str, int]] = None,
+            group_stats: Optional[Dict[str, dict]] = None,
+            workers: int = 2,
+            should_stop: Callable[[], bool] = lambda: False,
+            keywords: Optional[List[str]] = None,
+            post_filter: Optional[Callable[[list], list]] = None,
+            profiler=None
+    ):
+        self.client = client
+        self.default_max_posts = default_max_posts
+        self.group_limits = group_limits or {}
+        self.group_stats = group_stats or {}
+        self.workers = max(1, workers)
+        self.should_stop = should_stop
+        self.keywords = keywords or []  # Непустой список — поиск на стороне ВК (wall.search)
+        self.post_filter = post_filter  # Локальный фильтр постов перед передачей в on_result
+        self.profiler = profiler  # RunProfiler: каждый поток сбора профилируется отдельной секцией
+        self.logger = logging.getLogger(__name__)
+        self._stats_lock = threading.Lock()
+
+    def plan(self, groups: List[str], date_from: date_type, date_to: date_type) -> List[WorkUnit]:
+        """Формирование упорядоченного списка заданий"""
+        # Убираем дубликаты, сохраняя порядок
+        unique_groups = list(dict.fromkeys(groups))
+        days = max((date_to - date_from).days + 1, 1)
+
+        resolved = self.client.resolve_groups(unique_groups)
+        if len(resolved) < len(unique_groups):
+            self.logger.warning(
+                f"Пакетно разрешено {len(resolved)} из {len(unique_groups)} групп, "
+                f"остальные будут разрешены по одной"
+            )
+
+        units = []
+        for group in unique_groups:
+            stats = self.group_stats.get(group, {})
+            max_posts = int(self.group_limits.get(group, self.default_max_posts))
+            expected = min(stats.get("posts_per_day", 0.0) * days, max_posts)
+            units.append(WorkUnit(
+                group=group,
+                max_posts=max_posts,
+                expected_posts=expected,
+                last_collected=stats.get("last_collected", 0.0),
+                group_info=resolved.get(group)
+            ))
+
+        units.sort(key=lambda u: (u.last_collected > 0, -u.expected_posts, u.last_collected))
+        return units
+
+    def run(
+            self,
+            units: List[WorkUnit],
+            date_from: date_type,
+            date_to: date_type,
+            on_result: Callable[[WorkUnit, list, Optional[Exception]], None],
+            on_page: Optional[Callable[[WorkUnit, list], None]] = None
+    ):
+        """
+        Выполнение заданий в порядке приоритета.
+
+        on_result(unit, posts, error) вызывается из рабочего потока по
+        завершении каждого задания. Если задан on_page(unit, posts), посты
+        каждой страницы (после post_filter) передаются в него сразу, а в
+        on_result приходит пустой список.
+        """
+        days = max((date_to - date_from).days + 1, 1)
+
+        def process(unit: WorkUnit):
+            if self.should_stop():
+                return
+            fetched = [0]  # Постов до локального фильтра — для статистики группы
+            fetched_lock = threading.Lock()  # Страницы большой группы приходят из потоков шардов
+
+            def page_handler(page: list):
+                with fetched_lock:
+                    fetched[0] += len(page)
+                if self.post_filter:
+                    page = self.post_filter(page)
+                if page:
+                    on_page(unit, page)
+
+            try:
+                if self.keywords:
+                    posts = self.client.search_group_posts(
+                        group_id=unit.group,
+                        keywords=self.keywords,
+                        date_from=date_from,
+                        date_to=date_to,
+                        max_posts=unit.max_posts,
+                        group_info=unit.group_info,
+                        on_page=page_handler if on_page else None
+                    )
+                else:
+                    posts = self.client.get_posts_from_group(
+                        group_id=unit.group,
+                        date_from=date_from,
+                        date_to=date_to,
+                        max_posts=unit.max_posts,
+                        group_info=unit.group_info,
+                        on_page=page_handler if on_page else None
+                    )
+            except CollectionCancelled:
+                return  # Остановка внутри разрешения группы — частичных постов нет
+            except Exception as e:
+                on_result(unit, [], e)
+                return
+            # Число найденных по словам постов не отражает активность группы,
+            # а прерванный остановкой сбор дал бы заниженную оценку
+            if not self.keywords and not self.client.cancel_event.is_set():
+                self._update_stats(unit.group, fetched[0] if on_page else len(posts), days)
+            if self.post_filter:
+                posts = self.post_filter(posts)
+            on_result(unit, posts, None)
+
+        # Задания разбираются из очереди в порядке приоритета (FIFO)
+        pending = queue.Queue()
+        for unit in units:
+            pending.put(unit)
+
+        def collector(idx: int):
+            # cProfile видит только поток, в котором включён, — поэтому секция на каждый поток сбора
+            section = self.profiler.section(f"collector_{idx}") if self.profiler else nullcontext()
+            with section:
+                while True:
+                    try:
+                        unit = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    process(unit)
+
+        workers = min(self.workers, len(units)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="collector") as pool:
+            for future in [pool.submit(collector, idx) for idx in range(workers)]:
+                future.result()
+
+    def _update_stats(self, group: str, posts_count: int, days: int):
+        """Обновление статистики группы для следующего планирования"""
+        with self._stats_lock:
+            self.group_stats[group] = {
+                "last_collected": time.time(),
+                "posts_per_day": round(posts_count / days, 3)
+            }
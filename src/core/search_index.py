@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Полнотекстовый индекс собранных постов (SQLite FTS5)"""
+import re
+import sqlite3
+import threading
+from datetime import date as date_type, datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Префикс, которым VKClient._extract_full_text помечает тексты репостов
+REPOST_PREFIX = "🔁 [Репост] "
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    post_id TEXT NOT NULL UNIQUE,
+    group_id INTEGER NOT NULL,
+    group_name TEXT NOT NULL,
+    date INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    repost_text TEXT NOT NULL,
+    likes INTEGER NOT NULL DEFAULT 0,
+    reposts INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    post_url TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_group_date ON posts (group_id, date);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    text, repost_text,
+    content='posts', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, text, repost_text) VALUES (new.id, new.text, new.repost_text);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, text, repost_text) VALUES ('delete', old.id, old.text, old.repost_text);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE OF text, repost_text ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, text, repost_text) VALUES ('delete', old.id, old.text, old.repost_text);
+    INSERT INTO posts_fts (rowid, text, repost_text) VALUES (new.id, new.text, new.repost_text);
+END;
+"""
+
+
+def _split_text(full_text: str) -> tuple:
+    """Разделение полного текста на собственный текст и тексты репостов"""
+    parts = full_text.split("\n\n" + REPOST_PREFIX)
+    own = parts[0]
+    reposts = parts[1:]
+    if own.startswith(REPOST_PREFIX):
+        reposts.insert(0, own[len(REPOST_PREFIX):])
+        own = ""
+    return own, "\n\n".join(reposts)
+
+
+def _to_match_query(query: str) -> str:
+    """
+    Пользовательский запрос → выражение FTS5: все слова обязательны,
+    каждое ищется как префикс («нефт» найдёт «нефтяной»).
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class PostIndex:
+    """
+    Инкрементально пополняемый индекс постов.
+
+    Посты добавляются по мере сбора (повторно собранный пост обновляется),
+    поиск ранжируется по BM25 и не требует открывать выгрузки.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def add_posts(self, posts: List[Dict]):
+        """Добавление или обновление постов одной транзакцией"""
+        rows = []
+        for post in posts:
+            own, reposts = _split_text(post.get('text', ''))
+            post_date = post['date']
+            ts = int(post_date.timestamp()) if isinstance(post_date, datetime) else int(post_date)
+            rows.append((
+                post['post_id'], post['group_id'], post['group_name'], ts, own, reposts,
+                post.get('likes', 0), post.get('reposts', 0), post.get('comments', 0), post['post_url']
+            ))
+        if not rows:
+            return
+        with self._lock:
+            self._db.executemany(
+                """
+                INSERT INTO posts (post_id, group_id, group_name, date, text, repost_text,
+                                   likes, reposts, comments, post_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (post_id) DO UPDATE SET
+                    group_name = excluded.group_name,
+                    text = excluded.text,
+                    repost_text = excluded.repost_text,
+                    likes = excluded.likes,
+                    reposts = excluded.reposts,
+                    comments = excluded.comments
+                """,
+                rows
+            )
+            self._db.commit()
+
+    def search(
+            self,
+            query: str,
+            limit: int = 50,
+            group_id: Optional[int] = None,
+            date_from: Optional[date_type] = None,
+            date_to: Optional[date_type] = None
+    ) -> List[Dict]:
+        """Поиск с ранжированием BM25; текст поста весит больше текста репоста"""
+        match = _to_match_query(query)
+        if not match:
+            return []
+
+        sql = """
+            SELECT p.post_id, p.group_id, p.group_name, p.date, p.post_url, p.likes, p.reposts, p.comments,
+                   snippet(posts_fts, -1, '[', ']', '…', 12) AS snippet,
+                   bm25(posts_fts, 1.0, 0.5) AS rank
+            FROM posts_fts
+            JOIN posts p ON p.id = posts_fts.rowid
+            WHERE posts_fts MATCH ?
+        """
+        params = [match]
+        if group_id is not None:
+            sql += " AND p.group_id = ?"
+            params.append(group_id)
+        if date_from is not None:
+            sql += " AND p.date >= ?"
+            params.append(int(datetime.combine(date_from, datetime.min.time(), tzinfo=timezone.utc).timestamp()))
+        if date_to is not None:
+            sql += " AND p.date <= ?"
+            params.append(int(datetime.combine(date_to, datetime.max.time(), tzinfo=timezone.utc).timestamp()))
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            {
+                'post_id': row[0],
+                'group_id': row[1],
+                'group_name': row[2],
+                'date': datetime.fromtimestamp(row[3], tz=timezone.utc),
+                'post_url': row[4],
+                'likes': row[5],
+                'reposts': row[6],
+                'comments': row[7],
+                'snippet': row[8],
+                'rank': row[9]
+            }
+            for row in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""Локальный HTTP-сервис сбора: очередь заданий поверх общего клиента ВК"""
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import date as date_type
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+from .excel_exporter import ExcelExporter
+from .scheduler import JobScheduler
+
+
+@dataclass
+class Job:
+    """Задание сервиса: набор групп за период (и, возможно, ключевые слова)"""
+    id: str
+    groups: List[str]
+    date_from: date_type
+    date_to: date_type
+    keywords: List[str] = field(default_factory=list)
+    status: str = "queued"  # queued / running / done / failed
+    created: float = field(default_factory=time.time)
+    finished: float = 0.0
+    total_groups: int = 0
+    groups_done: int = 0
+    posts: int = 0
+    result: Optional[Path] = None
+    error: str = ""
+    submitters: int = 1  # Сколько одинаковых запросов объединено в это задание
+
+    @property
+    def key(self) -> tuple:
+        return tuple(sorted(set(self.groups))), self.date_from, self.date_to, tuple(sorted(self.keywords))
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "groups": len(self.groups),
+            "date_from": self.date_from.isoformat(),
+            "date_to": self.date_to.isoformat(),
+            "keywords": self.keywords,
+            "total_groups": self.total_groups,
+            "groups_done": self.groups_done,
+            "posts": self.posts,
+            "created": self.created,
+            "finished": self.finished or None,
+            "result": f"/jobs/{self.id}/result" if self.result else None,
+            "error": self.error or None,
+            "submitters": self.submitters
+        }
+
+
+class SharedFetches:
+    """
+    Обёртка VKClient для планировщиков разных заданий.
+
+    Если два задания одновременно собирают одну группу с теми же
+    параметрами, запрос к ВК выполняется один раз, второе задание ждёт
+    и получает тот же результат.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.cancel_event = client.cancel_event
+        self._inflight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def resolve_groups(self, group_identifiers: list) -> dict:
+        return self.client.resolve_groups(group_identifiers)
+
+    def get_posts_from_group(self, **kwargs) -> list:
+        return self._shared("wall.get", kwargs, lambda: self.client.get_posts_from_group(**kwargs))
+
+    def search_group_posts(self, **kwargs) -> list:
+        return self._shared("wall.search", kwargs, lambda: self.client.search_group_posts(**kwargs))
+
+    def _shared(self, kind: str, params: dict, fetch: Callable[[], list]) -> list:
+        key = (kind,) + tuple(sorted((name, repr(value)) for name, value in params.items() if name != "group_info"))
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if owner:
+            try:
+                future.set_result(fetch())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+        return list(future.result())  # Копия списка — у каждого задания свой
+
+
+class CollectionService:
+    """
+    Очередь заданий сбора с общими рейт-лимитом, кэшами и индексом.
+
+    Все задания работают через один VKClient (один рейт-лимит токена, общий
+    кэш оригиналов и, если включён, кэш ответов), результаты пополняют общий
+    полнотекстовый индекс. Повторная отправка задания, идентичного ещё не
+    завершённому, возвращает уже существующее задание.
+    """
+
+    def __init__(
+            self,
+            client,
+            output_dir: str,
+            logger,
+            workers: int = 2,
+            scheduler_workers: int = 2,
+            default_max_posts: int = 5000,
+            group_limits: Optional[Dict[str, int]] = None,
+            export_settings: Optional[dict] = None,
+            post_index=None
+    ):
+        self.fetcher = SharedFetches(client)
+        self.output_dir = Path(output_dir) / "сервис"
+        self.logger = logger
+        self.scheduler_workers = scheduler_workers
+        self.default_max_posts = default_max_posts
+        self.group_limits = group_limits or {}
+        self.export_settings = export_settings or {}
+        self.post_index = post_index
+        self.jobs: Dict[str, Job] = {}
+        self._active: Dict[tuple, str] = {}  # Ключ задания → ID незавершённого задания
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        for idx in range(max(1, workers)):
+            threading.Thread(target=self._worker, name=f"service-job-{idx}", daemon=True).start()
+
+    def submit(self, groups: List[str], date_from: date_type, date_to: date_type,
+               keywords: Optional[List[str]] = None) -> tuple:
+        """Постановка задания в очередь. Возвращает (задание, объединено ли с существующим)"""
+        job = Job(id=uuid.uuid4().hex[:12], groups=list(dict.fromkeys(groups)), date_from=date_from,
+                  date_to=date_to, keywords=list(keywords or []))
+        with self._lock:
+            existing_id = self._active.get(job.key)
+            if existing_id:
+                existing = self.jobs[existing_id]
+                existing.submitters += 1
+                return existing, True
+            self.jobs[job.id] = job
+            self._active[job.key] = job.id
+        self._queue.put(job)
+        self.logger.info(f"Задание {job.id}: {len(job.groups)} групп, {date_from} — {date_to}")
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._active.pop(job.key, None)
+
+    def _run(self, job: Job):
+        job.status = "running"
+        try:
+            scheduler = JobScheduler(
+                self.fetcher,
+                default_max_posts=self.default_max_posts,
+                group_limits=self.group_limits,
+                workers=self.scheduler_workers,
+                keywords=job.keywords
+            )
+            units = scheduler.plan(job.groups, job.date_from, job.date_to)
+            job.total_groups = len(units)
+            posts = []
+            posts_lock = threading.Lock()
+
+            def on_result(unit, unit_posts, error):
+                with posts_lock:
+                    if error:
+                        self.logger.warning(f"Задание {job.id}: ошибка группы {unit.group}: {error}")
+                    posts.extend(unit_posts)
+                    job.groups_done += 1
+                    job.posts = len(posts)
+
+            scheduler.run(units, job.date_from, job.date_to, on_result)
+            if self.post_index and posts:
+                self.post_index.add_posts(posts)
+            if posts:
+                job_dir = self.output_dir / job.id
+                job_dir.mkdir(parents=True, exist_ok=True)
+                exporter = ExcelExporter(str(job_dir), self.logger, **self.export_settings)
+                result = Path(exporter.export_posts(posts))
+                reports = [f for f in job_dir.iterdir() if f.is_file()]
+                # Тексты длиннее ячейки Excel — отдельными файлами, на них ссылаются примечания в отчёте
+                full_texts = [f for f in exporter.full_text_dir.rglob("*") if f.is_file()]
+                if len(reports) > 1 or full_texts:
+                    # Оглавление и примечания ссылаются на соседние файлы — отдаём всё одним архивом
+                    result = self.output_dir / f"{job.id}.zip"
+                    with zipfile.ZipFile(result, "w") as archive:
+                        for file in sorted(reports + full_texts):
+                            archive.write(file, file.relative_to(job_dir).as_posix())
+                job.result = result
+            job.status = "done"
+            self.logger.success(f"Задание {job.id} выполнено: {len(posts)} постов")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self.logger.error(f"Задание {job.id} завершилось с ошибкой: {e}")
+        finally:
+            job.finished = time.time()
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs                — {"groups": [...], "date_from": "ГГГГ-ММ-ДД", "date_to": "...", "keywords": [...]}
+    GET  /jobs                — список заданий
+    GET  /jobs/<id>           — состояние задания
+    GET  /jobs/<id>/result    — файл отчёта или zip-архив (части с оглавлением, полные тексты длинных постов)
+    """
+
+    server_version = "VKPostCollector"
+
+    @property
+    def service(self) -> CollectionService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(f"{self.client_address[0]} {format % args}")
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        api_key = self.server.api_key
+        if api_key and self.headers.get("X-Api-Key") != api_key:
+            self._send_json(401, {"error": "Неверный или отсутствующий X-Api-Key"})
+            return False
+        return True
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "Не найдено"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("ожидается JSON-объект")
+            if not isinstance(request.get("groups", []), list) or not isinstance(request.get("keywords", []), list):
+                raise ValueError("groups и keywords должны быть списками")
+            groups = [str(g).strip() for g in request.get("groups", []) if str(g).strip()]
+            if not groups:
+                raise ValueError("Список групп пуст")
+            date_from = date_type.fromisoformat(request["date_from"])
+            date_to = date_type.fromisoformat(request["date_to"])
+            if date_from > date_to:
+                raise ValueError("date_from позже date_to")
+            keywords = [str(k).strip() for k in request.get("keywords", []) if str(k).strip()]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Некорректное задание: {e}"})
+            return
+
+        job, merged = self.service.submit(groups, date_from, date_to, keywords)
+        self._send_json(200 if merged else 202, dict(job.to_dict(), merged=merged))
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["jobs"]:
+            self._send_json(200, [job.to_dict() for job in list(self.service.jobs.values())])
+            return
+        job = self.service.get(parts[1]) if len(parts) in (2, 3) and parts[0] == "jobs" else None
+        if job is None:
+            self._send_json(404, {"error": "Задание не найдено"})
+        elif len(parts) == 2:
+            self._send_json(200, job.to_dict())
+        elif parts[2] != "result":
+            self._send_json(404, {"error": "Не найдено"})
+        elif not job.result:
+            self._send_json(409, {"error": f"Результата нет (статус: {job.status})"})
+        else:
+            self._send_file(job.result)
+
+    def _send_file(self, path: Path):
+        size = path.stat().st_size
+        self.send_response(200)
+        if path.suffix == ".zip":
+            self.send_header("Content-Type", "application/zip")
+        else:
+            self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(path.name)}")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        with open(path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                self.wfile.write(chunk)
+
+
+def create_server(
+        service: CollectionService,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        api_key: Optional[str] = None
+) -> ThreadingHTTPServer:
+    """HTTP-сервер для сервиса (запуск — serve_forever())"""
+    server = ThreadingHTTPServer((host, port), _ServiceHandler)
+    server.service = service
+    server.api_key = api_key
+    server.daemon_threads = True
+    return server
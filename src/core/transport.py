@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""HTTP-транспорт для ВКонтакте API: пул соединений, повторы и circuit breaker"""
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from vk_api.exceptions import ApiError, ApiHttpError
+
+# Коды ошибок ВК, при которых имеет смысл повторить запрос:
+# 6 — слишком много запросов в секунду, 9 — слишком много однотипных действий,
+# 10 — внутренняя ошибка сервера
+RETRYABLE_VK_CODES = (6, 9, 10)
+# Превышен лимит запросов всего токена — не признак сбоя отдельной группы
+RATE_LIMIT_VK_CODE = 6
+
+
+class CircuitOpenError(Exception):
+    """Запросы по ключу временно заблокированы circuit breaker'ом"""
+
+
+class CollectionCancelled(BaseException):
+    """Сбор остановлен пользователем.
+
+    Наследуется от BaseException (как KeyboardInterrupt), чтобы не
+    перехватываться обработчиками `except Exception` по пути наверх.
+    """
+
+
+class TimeoutSession(requests.Session):
+    """Сессия requests с таймаутом по умолчанию (vk_api его не выставляет)"""
+
+    def __init__(self, timeout=(5, 30)):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+
+def build_session(pool_size: int = 10, timeout=(5, 30)) -> requests.Session:
+    """Сессия с keep-alive пулом соединений и сжатием gzip.
+
+    Повторы на уровне urllib3 отключены — ими управляет ResilientTransport.
+    """
+    session = TimeoutSession(timeout=timeout)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+class RetryPolicy:
+    """Экспоненциальные повторы с полным джиттером"""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Пауза перед повтором номер `attempt` (с 1)"""
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Временная ли это ошибка (таймаут, обрыв соединения, 5xx, коды ВК 6/9/10)"""
+        if isinstance(error, (requests.Timeout, requests.ConnectionError)):
+            return True
+        if isinstance(error, ApiHttpError):
+            return error.response is not None and error.response.status_code >= 500
+        if isinstance(error, ApiError):
+            return error.code in RETRYABLE_VK_CODES
+        return False
+
+    @staticmethod
+    def is_rate_limited(error: Exception) -> bool:
+        """Ошибка рейт-лимита токена (код ВК 6)"""
+        return isinstance(error, ApiError) and error.code == RATE_LIMIT_VK_CODE
+
+
+class CircuitBreaker:
+    """Circuit breaker для одного ключа (обычно — одной группы).
+
+    После `failure_threshold` подряд временных ошибок размыкается на
+    `reset_timeout` секунд; затем пропускает одну пробную попытку.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow_request(self) -> bool:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class ResilientTransport:
+    """Выполнение вызовов API с повторами и circuit breaker'ом по ключу"""
+
+    def __init__(
+            self,
+            retry_policy: Optional[RetryPolicy] = None,
+            failure_threshold: int = 5,
+            reset_timeout: float = 300.0,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[key]
+
+    def call(
+            self,
+            key: str,
+            func: Callable,
+            before_attempt: Optional[Callable[[], None]] = None,
+            sleep: Optional[Callable[[float], None]] = None
+    ):
+        """Вызов `func()` с повторами временных ошибок.
+
+        `before_attempt` вызывается перед каждой попыткой (например, для
+        соблюдения рейт-лимита), `sleep` заменяет паузу между повторами
+        (например, прерываемой). Невременные ошибки пробрасываются сразу.
+        """
+        sleep = sleep or self.sleep
+        breaker = self.breaker(key)
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                raise CircuitOpenError(f"'{key}' временно пропускается после серии сетевых ошибок")
+
+            attempt += 1
+            if before_attempt:
+                before_attempt()
+            try:
+                result = func()
+            except Exception as e:
+                if not self.retry_policy.is_retryable(e):
+                    raise
+                # Рейт-лимит касается всего токена: повторяем с паузой, но группу не «размыкаем»
+                if not self.retry_policy.is_rate_limited(e):
+                    breaker.record_failure()
+                if attempt >= self.retry_policy.max_attempts or breaker.state == CircuitBreaker.OPEN:
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                self.logger.warning(
+                    f"Временная ошибка для '{key}' ({e}), попытка {attempt}/{self.retry_policy.max_attempts}, "
+                    f"пауза {delay:.1f} сек..."
+                )
+                sleep(delay)
+                continue
+
+            breaker.record_success()
+            return result
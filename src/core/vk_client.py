@@ -1,36 +1,130 @@
 # -*- coding: utf-8 -*-
 """Клиент для работы с ВКонтакте API"""
+import json
+import queue
 import time
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from datetime import datetime, timezone, date as date_type
+from typing import Callable, Optional
 import logging
 import vk_api
-from vk_api.exceptions import ApiError
+from vk_api.exceptions import ApiError, TOO_MANY_RPS_CODE
+from vk_api.vk_api import VkApiMethod
+from .transport import ResilientTransport, CircuitOpenError, CollectionCancelled, build_session
+from .origin_cache import OriginCache
+from .progress import PageProgress
+from .response_cache import ResponseCache
 
 
 class VKClient:
-    def __init__(self, token: str):
+    EXECUTE_BATCH_SIZE = 25  # Максимум вызовов API в одном execute
+    NEWSFEED_GROUP = "Лента"  # Имя «группы» в событиях прогресса поиска по ленте
+    SHARD_MIN_POSTS = 1000  # Параллельный обход группы — только если в периоде ожидается не меньше стольких постов
+    SHARD_OVERLAP = 20  # Перекрытие соседних шардов: новые посты сдвигают смещения, пока идёт обход
+
+    def __init__(
+            self,
+            token: str,
+            transport: ResilientTransport = None,
+            origin_cache: OriginCache = None,
+            cancel_event: threading.Event = None,
+            on_progress: Optional[Callable[[PageProgress], None]] = None,
+            response_cache: Optional[ResponseCache] = None
+    ):
         self.token = token
-        self.vk_session = vk_api.VkApi(token=token)
+        self.http_session = build_session()
+        self.vk_session = self._create_session(self.http_session)
         self.vk = self.vk_session.get_api()
+        self.transport = transport or ResilientTransport()
+        self.origin_cache = origin_cache or OriginCache()
+        # Установка события прерывает сбор не позднее следующего запроса или паузы
+        # (все паузы клиента — в _sleep, собственные паузы vk_api отключены выше)
+        self.cancel_event = cancel_event or threading.Event()
+        # Вызывается после каждой страницы выдачи (из рабочего потока)
+        self.on_progress = on_progress
+        # Дисковый кэш ответов (None — все запросы идут в сеть)
+        self.response_cache = response_cache
         self.last_request_time = 0
+        self._rate_lock = threading.Lock()
+        self._request_times = deque(maxlen=20)  # Окно для оценки скорости запросов
         self.rate_limit_delay = 0.25  # 0.25 сек = 4 запроса/сек (безопасный лимит)
+        # Число параллельных шардов при обходе одной большой группы (1 — последовательно)
+        self.intra_group_shards = 1
+        self._shard_apis = queue.Queue()  # Свободные соединения шардов (у каждого своя сессия и блокировка vk_api)
 
         # Инициализация внутреннего логгера
         self.logger = logging.getLogger(__name__)
 
+    def _create_session(self, http_session) -> vk_api.VkApi:
+        """Сессия vk_api поверх собственного пула соединений"""
+        session = vk_api.VkApi(token=self.token, session=http_session)
+        # Паузы и повторы — только в _respect_rate_limit и транспорте: собственные паузы vk_api
+        # (RPS_DELAY под блокировкой и бесконечные повторы ошибки 6 через 0.5 сек) не прерываются
+        # остановкой и обходят джиттер, circuit breaker и лимит попыток
+        session.RPS_DELAY = 0
+        session.error_handlers.pop(TOO_MANY_RPS_CODE, None)
+        return session
+
+    def _sleep(self, seconds: float):
+        """Пауза, прерываемая остановкой сбора"""
+        if self.cancel_event.wait(seconds):
+            raise CollectionCancelled()
+
     def _respect_rate_limit(self):
-        """Соблюдение рейт-лимита ВКонтакте"""
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - elapsed)
-        self.last_request_time = time.time()
+        """Соблюдение рейт-лимита ВКонтакте (общего для всех потоков клиента)"""
+        if self.cancel_event.is_set():
+            raise CollectionCancelled()
+        with self._rate_lock:
+            elapsed = time.time() - self.last_request_time
+            if elapsed < self.rate_limit_delay:
+                self._sleep(self.rate_limit_delay - elapsed)
+            self.last_request_time = time.time()
+            self._request_times.append(self.last_request_time)
+
+    def requests_per_second(self) -> float:
+        """Скорость запросов по последним 20 вызовам (снижается при простое)"""
+        with self._rate_lock:
+            if len(self._request_times) < 2:
+                return 0.0
+            span = max(self._request_times[-1], time.time()) - self._request_times[0]
+            return (len(self._request_times) - 1) / span if span > 0 else 0.0
+
+    def _report_progress(self, group: str, pages: int, accepted: int, skipped: int, oldest_ts: int = None):
+        """Публикация события прогресса после страницы выдачи"""
+        if not self.on_progress:
+            return
+        self.on_progress(PageProgress(
+            group=group,
+            pages=pages,
+            accepted=accepted,
+            skipped=skipped,
+            oldest_date=datetime.fromtimestamp(oldest_ts, tz=timezone.utc) if oldest_ts else None,
+            requests_per_sec=self.requests_per_second()
+        ))
+
+    def _call(self, key: str, method, **params):
+        """Вызов метода API через кэш ответов и транспорт (рейт-лимит, повторы, circuit breaker по ключу)"""
+        name = method._method if isinstance(method, VkApiMethod) else None
+        cache = self.response_cache if name and self.response_cache and self.response_cache.handles(name) else None
+        if cache:
+            cached = cache.get(name, params)
+            if cached is not None:
+                return cached
+
+        response = self.transport.call(
+            key, lambda: method(**params), before_attempt=self._respect_rate_limit, sleep=self._sleep
+        )
+        if cache:
+            cache.put(name, params, response)
+        return response
 
     def get_user_info(self) -> str:
         """Получение информации о пользователе для проверки токена"""
-        self._respect_rate_limit()
         try:
-            response = self.vk.users.get()
+            response = self._call("users.get", self.vk.users.get)
             if response and len(response) > 0:
                 user = response[0]
                 return f"{user.get('first_name', '')} {user.get('last_name', '')} (id{user.get('id', '')})"
@@ -40,14 +134,13 @@ class VKClient:
 
     def resolve_group_id(self, group_identifier: str) -> int:
         """Преобразование короткого имени группы в цифровой ID"""
-        self._respect_rate_limit()
         try:
             # Если уже цифровой ID (с минусом для групп)
             if group_identifier.lstrip('-').isdigit():
                 return int(group_identifier)
 
             # Иначе — поиск через группы
-            response = self.vk.groups.getById(group_id=group_identifier)
+            response = self._call(group_identifier, self.vk.groups.getById, group_id=group_identifier)
             if response and len(response) > 0:
                 return -response[0]['id']  # Группы имеют отрицательные ID
             raise ValueError(f"Группа '{group_identifier}' не найдена")
@@ -60,15 +153,137 @@ class VKClient:
         except Exception as e:
             raise Exception(f"Ошибка определения группы: {e}")
 
+    def resolve_groups(self, group_identifiers: list) -> dict:
+        """
+        Пакетное разрешение групп через groups.getById (до 500 групп за запрос).
+
+        Возвращает словарь {идентификатор: (owner_id, group_name)}. Группы,
+        которые не удалось разрешить, в словарь не попадают.
+        """
+        resolved = {}
+        batch_size = 500
+        for start in range(0, len(group_identifiers), batch_size):
+            batch = group_identifiers[start:start + batch_size]
+            # Цифровые ID передаём без минуса, короткие имена — как есть
+            ids = [g.lstrip('-') if g.lstrip('-').isdigit() else g for g in batch]
+            try:
+                response = self._call("groups.getById", self.vk.groups.getById, group_ids=",".join(ids))
+            except Exception as e:
+                self.logger.warning(f"Ошибка пакетного разрешения групп ({len(batch)} шт.): {e}")
+                continue
+
+            by_key = {}
+            for info in response or []:
+                name = info.get('name', f"group_{info['id']}")
+                by_key[str(info['id'])] = (-info['id'], name)
+                if info.get('screen_name'):
+                    by_key[info['screen_name'].lower()] = (-info['id'], name)
+
+            for identifier, key in zip(batch, ids):
+                match = by_key.get(key.lower())
+                if not match:
+                    continue
+                if identifier.lstrip('-').isdigit():
+                    # Цифровой ID используем как есть — как и resolve_group_id()
+                    match = (int(identifier), match[1])
+                resolved[identifier] = match
+        return resolved
+
+    def _group_owner_and_name(self, group_id: str, group_info: tuple = None) -> tuple:
+        """Пара (owner_id, group_name): из пакетного разрешения или отдельными запросами"""
+        if group_info:
+            return group_info
+
+        # Преобразуем идентификатор в цифровой ID
+        owner_id = self.resolve_group_id(group_id)
+
+        # Получаем информацию о группе для названия
+        info = self._call(group_id, self.vk.groups.getById, group_id=abs(owner_id))[0]
+        return owner_id, info.get('name', f'group_{abs(owner_id)}')
+
+    @staticmethod
+    def _date_bounds(date_from: date_type, date_to: date_type) -> tuple:
+        """Границы периода в Unix-времени (UTC, включительно)"""
+        # Преобразуем даты в datetime с временной зоной UTC
+        date_from_dt = datetime.combine(date_from, datetime.min.time(), tzinfo=timezone.utc)
+        date_to_dt = datetime.combine(date_to, datetime.max.time(), tzinfo=timezone.utc)
+        return int(date_from_dt.timestamp()), int(date_to_dt.timestamp())
+
+    def _build_post(self, item: dict, owner_id: int, group_name: str) -> dict:
+        """Пост в формате экспорта (см. get_posts_from_group)"""
+        # Обработка полного текста (включая репосты)
+        full_text = self._extract_full_text(item)
+
+        return {
+            'group_id': owner_id,
+            'group_name': group_name,
+            'post_id': f"{owner_id}_{item.get('id')}",
+            'date': datetime.fromtimestamp(item.get('date', 0), tz=timezone.utc),
+            'text': full_text,
+            'likes': item.get('likes', {}).get('count', 0),
+            'reposts': item.get('reposts', {}).get('count', 0),
+            'comments': item.get('comments', {}).get('count', 0),
+            'post_url': f"https://vk.com/wall{owner_id}_{item.get('id')}",
+            'attachments': self._parse_attachments(item)
+        }
+
+    @staticmethod
+    def _parse_attachments(item: dict) -> list:
+        """
+        Компактное описание вложений поста и его репостов.
+
+        Каждое вложение — {'type', 'url'[, 'title'][, 'ext']}; для фото берётся
+        ссылка на самый крупный размер, для видео — страница ролика во ВКонтакте.
+        """
+        attachments = []
+        sources = [item] + list(item.get('copy_history') or [])
+        for source in sources:
+            for attachment in source.get('attachments') or []:
+                kind = attachment.get('type')
+                data = attachment.get(kind) or {}
+                parsed = {'type': kind}
+                if kind == 'photo':
+                    sizes = data.get('sizes') or []
+                    if sizes:
+                        largest = max(sizes, key=lambda size: size.get('width', 0) * size.get('height', 0))
+                        parsed['url'] = largest.get('url')
+                elif kind == 'video':
+                    parsed['url'] = f"https://vk.com/video{data.get('owner_id')}_{data.get('id')}"
+                    parsed['title'] = data.get('title', '')
+                elif kind == 'link':
+                    parsed['url'] = data.get('url')
+                    parsed['title'] = data.get('title', '')
+                elif kind == 'doc':
+                    parsed['url'] = data.get('url')
+                    parsed['title'] = data.get('title', '')
+                    parsed['ext'] = data.get('ext', '')
+                elif kind == 'audio':
+                    parsed['title'] = f"{data.get('artist', '')} — {data.get('title', '')}"
+                elif kind == 'poll':
+                    parsed['title'] = data.get('question', '')
+                attachments.append(parsed)
+        return attachments
+
     def get_posts_from_group(
             self,
             group_id: str,
             date_from: date_type,
-            date_to: date_type
+            date_to: date_type,
+            max_posts: int = 5000,
+            group_info: tuple = None,
+            after_post_id: int = 0,
+            on_page: Optional[Callable[[list], None]] = None
     ) -> list:
         """
         Получение постов из группы за период с пагинацией.
 
+        max_posts — лимит постов для группы (настраивается в конфиге),
+        group_info — заранее полученная пара (owner_id, group_name), если
+        группа уже разрешена пакетно через resolve_groups(),
+        after_post_id — собирать только посты новее указанного ID (инкрементальный опрос),
+        on_page — если задан, посты передаются в него постранично по мере получения
+        и в возвращаемый список не попадают (группа не копится в памяти).
+
         Возвращает список постов в формате:
         {
             'group_id': int,
@@ -79,36 +294,25 @@ class VKClient:
             'likes': int,
             'reposts': int,
             'comments': int,
-            'post_url': str
+            'post_url': str,
+            'attachments': list  # См. _parse_attachments()
         }
         """
-        # Преобразуем идентификатор в цифровой ID
-        resolved_id = self.resolve_group_id(group_id)
-        owner_id = resolved_id
-
-        # Получаем информацию о группе для названия
-        self._respect_rate_limit()
-        group_info = self.vk.groups.getById(group_id=abs(owner_id))[0]
-        group_name = group_info.get('name', f'group_{abs(owner_id)}')
-
-        # Преобразуем даты в datetime с временной зоной UTC
-        from datetime import datetime as dt
-        date_from_dt = dt.combine(date_from, dt.min.time(), tzinfo=timezone.utc)
-        date_to_dt = dt.combine(date_to, dt.max.time(), tzinfo=timezone.utc)
-
-        ts_from = int(date_from_dt.timestamp())
-        ts_to = int(date_to_dt.timestamp())
+        owner_id, group_name = self._group_owner_and_name(group_id, group_info)
+        ts_from, ts_to = self._date_bounds(date_from, date_to)
 
         posts = []
+        accepted = 0
         offset = 0
+        pages = 0
+        skipped = 0
         max_posts_per_request = 100
-        max_total_posts = 5000  # Ограничение ВК на 5000 постов в методе
-
-        while offset < max_total_posts:
-            self._respect_rate_limit()
 
+        while accepted < max_posts:
             try:
-                response = self.vk.wall.get(
+                response = self._call(
+                    group_id,
+                    self.vk.wall.get,
                     owner_id=owner_id,
                     count=max_posts_per_request,
                     offset=offset,
@@ -119,62 +323,536 @@ class VKClient:
                 if not items:
                     break
 
+                # Оригиналы репостов страницы — одним пакетом, через общий кэш
+                self._resolve_origins([i for i in items if ts_from <= i.get('date', 0) <= ts_to])
+
+                finished = False
+                page_posts = []
                 for item in items:
                     post_date = item.get('date', 0)
 
+                    # Закреплённый пост стоит первым вне хронологии — по нему нельзя прерывать обход
+                    if item.get('is_pinned') and (post_date < ts_from or item.get('id', 0) <= after_post_id):
+                        skipped += 1
+                        continue
+
                     # Проверка попадания в период
                     if post_date < ts_from:
                         # Посты идут от новых к старым — можно прервать
-                        return posts
+                        finished = True
+                        break
+
+                    if item.get('id', 0) <= after_post_id:
+                        finished = True  # Дальше только уже собранные посты
+                        break
 
                     if post_date > ts_to:
+                        skipped += 1
                         continue  # Пропускаем посты вне периода
 
-                    # Обработка полного текста (включая репосты)
-                    full_text = self._extract_full_text(item)
-
-                    post_data = {
-                        'group_id': owner_id,
-                        'group_name': group_name,
-                        'post_id': f"{owner_id}_{item.get('id')}",
-                        'date': datetime.fromtimestamp(post_date, tz=timezone.utc),
-                        'text': full_text,
-                        'likes': item.get('likes', {}).get('count', 0),
-                        'reposts': item.get('reposts', {}).get('count', 0),
-                        'comments': item.get('comments', {}).get('count', 0),
-                        'post_url': f"https://vk.com/wall{owner_id}_{item.get('id')}"
-                    }
-                    posts.append(post_data)
+                    page_posts.append(self._build_post(item, owner_id, group_name))
+
+                page_posts = page_posts[:max_posts - accepted]
+                accepted += len(page_posts)
+                if on_page:
+                    if page_posts:
+                        on_page(page_posts)
+                else:
+                    posts.extend(page_posts)
+
+                pages += 1
+                self._report_progress(group_id, pages, accepted, skipped, items[-1].get('date'))
 
                 # Проверка на достижение конца списка
-                if len(items) < max_posts_per_request:
+                if finished or len(items) < max_posts_per_request:
                     break
 
+                # Большая группа: остаток периода обходим параллельными шардами
+                if pages == 1 and self.intra_group_shards > 1 and not after_post_id and accepted < max_posts:
+                    sharded = self._fetch_sharded(
+                        group_id, owner_id, group_name, ts_from, ts_to, items,
+                        total=response.get('count', 0),
+                        limit=max_posts - accepted,
+                        seen={p['post_id'] for p in page_posts},
+                        on_page=on_page,
+                        progress=(pages, accepted, skipped)
+                    )
+                    if sharded is not None:
+                        accepted += sharded[1]
+                        posts.extend(sharded[0])
+                        break
+
                 offset += max_posts_per_request
 
                 # Защита от превышения лимита
-                if len(posts) >= max_total_posts:
-                    self.logger.warning(f"Достигнут лимит постов (5000) для группы {group_id}")
+                if accepted >= max_posts:
+                    self.logger.warning(f"Достигнут лимит постов ({max_posts}) для группы {group_id}")
                     break
 
             except ApiError as e:
-                if e.code == 6:  # Too many requests per second
-                    self.logger.warning("Достигнут рейт-лимит ВК, пауза 1.5 сек...")
-                    time.sleep(1.5)
-                    continue
-                elif e.code in (15, 18):  # Доступ запрещён / Страница удалена
+                # Коды 6, 9, 10 уже повторены транспортом — сюда попадают окончательные ошибки
+                if e.code in (15, 18):  # Доступ запрещён / Страница удалена
                     # НЕ используем переменную item здесь — она может быть не определена!
                     self.logger.warning(f"Пропущена группа {group_id} из-за ограничений доступа (код {e.code})")
                     break
                 else:
                     raise Exception(f"Ошибка ВКонтакте ({e.code}): {e}")
+            except CircuitOpenError as e:
+                raise Exception(f"Группа {group_id} пропущена: {e}")
+            except CollectionCancelled:
+                self.logger.warning(f"Сбор группы {group_id} прерван, получено постов: {accepted}")
+                break
             except Exception as e:
                 raise Exception(f"Ошибка получения постов: {e}")
 
         return posts
 
+    def _probe_offset(self, group_id: str, owner_id: int, ts: int, lo: int, hi: int) -> int:
+        """Наименьшее смещение в [lo, hi], на котором пост старше ts (деление пополам запросами count=1)"""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            items = self._call(group_id, self.vk.wall.get, owner_id=owner_id, count=1, offset=mid).get('items', [])
+            if not items or items[0].get('date', 0) < ts:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _acquire_shard_api(self):
+        """Соединение для шарда: VkApi держит блокировку на весь HTTP-запрос, поэтому у шардов они свои"""
+        try:
+            return self._shard_apis.get_nowait()
+        except queue.Empty:
+            return self._create_session(build_session(pool_size=1)).get_api()
+
+    def _fetch_sharded(
+            self,
+            group_id: str,
+            owner_id: int,
+            group_name: str,
+            ts_from: int,
+            ts_to: int,
+            first_page: list,
+            total: int,
+            limit: int,
+            seen: set,
+            on_page: Optional[Callable[[list], None]],
+            progress: tuple
+    ) -> Optional[tuple]:
+        """
+        Параллельный обход остатка периода одной группы после первой страницы.
+
+        Конец периода оценивается по частоте публикаций на первой странице и
+        общему числу постов (count) без дополнительных запросов; пробные
+        запросы (count=1, деление пополам) нужны, только если первая страница
+        целиком новее периода. Диапазон смещений делится на шарды, каждый
+        обходится через своё соединение VkApi под общим рейт-лимитом клиента,
+        поэтому запросы шардов идут по сети одновременно. Шард заходит на
+        SHARD_OVERLAP постов в следующий, последний идёт до начала периода;
+        посты склеиваются без дубликатов по ID.
+
+        Возвращает (посты, число принятых постов) или None, если период
+        слишком мал для параллельного обхода.
+        """
+        page_size = 100
+        start = len(first_page)
+        dates = [i.get('date', 0) for i in first_page if not i.get('is_pinned')]
+        if not dates or total <= start:
+            return None
+        newest, oldest = max(dates), min(dates)
+        if oldest > ts_to:
+            # Первая страница целиком новее периода — начало периода ищем пробными запросами
+            start = self._probe_offset(group_id, owner_id, ts_to + 1, start, total)
+            end = min(total, start + limit)
+        else:
+            # С запасом 20%: недооценку всё равно покроет последний шард, переоценка стоит шардам одного запроса
+            rate = len(dates) / max(newest - oldest, 1)
+            end = min(total, start + limit, start + int((oldest - ts_from) * rate * 1.2))
+            if end - start < self.SHARD_MIN_POSTS:
+                return None
+        if end <= start:
+            return [], 0
+
+        shards = max(1, min(self.intra_group_shards, -(-(end - start) // page_size)))
+        step = -(-(end - start) // shards)
+        bounds = [(a, min(a + step, end)) for a in range(start, end, step)]
+        self.logger.info(f"Группа {group_id}: смещения {start}–{end} обходятся в {len(bounds)} потоков")
+
+        lock = threading.Lock()
+        seen = set(seen)
+        found = []
+        state = {"pages": progress[0], "accepted": progress[1], "skipped": progress[2], "new": 0}
+        last_stop = min(total, start + limit + self.SHARD_OVERLAP)
+
+        def accept(page_posts: list) -> list:
+            """Посты страницы, которых ещё не было (на стыках шарды пересекаются), в пределах лимита"""
+            with lock:
+                fresh = [p for p in page_posts if p['post_id'] not in seen]
+                if on_page:
+                    fresh = fresh[:max(limit - state["new"], 0)]
+                seen.update(p['post_id'] for p in fresh)
+                state["new"] += len(fresh)
+                if not on_page:
+                    found.extend(fresh)
+                return fresh
+
+        def fetch_range(first: int, last: int, is_last: bool):
+            api = self._acquire_shard_api()
+            offset = first
+            stop = last_stop if is_last else min(last + self.SHARD_OVERLAP, total)
+            try:
+                while offset < stop:
+                    response = self._call(
+                        group_id,
+                        api.wall.get,
+                        owner_id=owner_id,
+                        count=min(page_size, stop - offset),
+                        offset=offset,
+                        extended=0
+                    )
+                    items = response.get('items', [])
+                    if not items:
+                        break
+                    in_window = [i for i in items if ts_from <= i.get('date', 0) <= ts_to and not i.get('is_pinned')]
+                    self._resolve_origins(in_window)
+                    fresh = accept([self._build_post(item, owner_id, group_name) for item in in_window])
+                    if on_page and fresh:
+                        on_page(fresh)
+                    with lock:
+                        state["pages"] += 1
+                        state["accepted"] += len(fresh)
+                        state["skipped"] += len(items) - len(in_window)
+                        snapshot = (state["pages"], state["accepted"], state["skipped"])
+                    # Без даты: шарды идут по разным участкам периода, доля считается по лимиту постов
+                    self._report_progress(group_id, *snapshot)
+                    if items[-1].get('date', 0) < ts_from:
+                        break  # Дальше только посты старше периода
+                    offset += len(items)
+            except CollectionCancelled:
+                pass  # Возвращаем уже собранное; остановку заметит вызывающий код
+            finally:
+                self._shard_apis.put(api)
+
+        with ThreadPoolExecutor(max_workers=len(bounds), thread_name_prefix=f"shard-{group_id}") as pool:
+            futures = [
+                pool.submit(fetch_range, first, last, idx == len(bounds) - 1)
+                for idx, (first, last) in enumerate(bounds)
+            ]
+            for future in futures:
+                future.result()
+
+        if self.cancel_event.is_set():
+            self.logger.warning(f"Сбор группы {group_id} прерван, получено постов: {state['accepted']}")
+        posts = sorted(found, key=lambda p: p['date'], reverse=True)
+        if len(posts) > limit or state["new"] >= limit:
+            self.logger.warning(f"Достигнут лимит постов для группы {group_id}")
+        posts = posts[:limit]
+        return posts, len(posts) if not on_page else state["new"]
+
+    def search_group_posts(
+            self,
+            group_id: str,
+            keywords: list,
+            date_from: date_type,
+            date_to: date_type,
+            max_posts: int = 5000,
+            group_info: tuple = None,
+            on_page: Optional[Callable[[list], None]] = None
+    ) -> list:
+        """
+        Поиск постов группы по ключевым словам на стороне ВК (wall.search).
+
+        По сети передаются только совпавшие посты. Для каждого слова — свой
+        обход с пагинацией; результаты объединяются без дубликатов. Формат
+        постов и смысл on_page такие же, как у get_posts_from_group().
+        """
+        owner_id, group_name = self._group_owner_and_name(group_id, group_info)
+        ts_from, ts_to = self._date_bounds(date_from, date_to)
+
+        found = {}  # ID поста → пост (при on_page — только ID, чтобы отсеять повторы)
+        pages = 0
+        skipped = 0
+        max_posts_per_request = 100
+        try:
+            for keyword in keywords:
+                offset = 0
+                while len(found) < max_posts:
+                    try:
+                        response = self._call(
+                            group_id,
+                            self.vk.wall.search,
+                            owner_id=owner_id,
+                            query=keyword,
+                            owners_only=1,
+                            count=max_posts_per_request,
+                            offset=offset
+                        )
+                    except ApiError as e:
+                        if e.code in (15, 18):  # Доступ запрещён / Страница удалена
+                            self.logger.warning(
+                                f"Пропущена группа {group_id} из-за ограничений доступа (код {e.code})"
+                            )
+                            return [] if on_page else list(found.values())
+                        raise Exception(f"Ошибка ВКонтакте ({e.code}): {e}")
+                    except CircuitOpenError as e:
+                        raise Exception(f"Группа {group_id} пропущена: {e}")
+                    except Exception as e:
+                        raise Exception(f"Ошибка поиска постов: {e}")
+
+                    items = response.get('items', [])
+                    in_window = [i for i in items if ts_from <= i.get('date', 0) <= ts_to and not i.get('is_pinned')]
+                    self._resolve_origins(in_window)
+                    page_posts = []
+                    for item in in_window:
+                        post = self._build_post(item, owner_id, group_name)
+                        if post['post_id'] in found or (on_page and len(found) >= max_posts):
+                            continue
+                        found[post['post_id']] = None if on_page else post
+                        page_posts.append(post)
+                    if on_page and page_posts:
+                        on_page(page_posts)
+                    pages += 1
+                    skipped += len(items) - len(in_window)
+                    oldest = items[-1].get('date') if items else None
+                    self._report_progress(group_id, pages, len(found), skipped, oldest)
+
+                    # Выдача идёт от новых к старым: если вся страница старше периода — дальше искать нечего
+                    older = [i for i in items if i.get('date', 0) < ts_from and not i.get('is_pinned')]
+                    if len(items) < max_posts_per_request or (items and len(older) == len(items)):
+                        break
+                    offset += max_posts_per_request
+        except CollectionCancelled:
+            self.logger.warning(f"Поиск в группе {group_id} прерван, найдено постов: {len(found)}")
+
+        if on_page:
+            return []
+        posts = sorted(found.values(), key=lambda p: p['date'], reverse=True)
+        return posts[:max_posts]
+
+    def search_newsfeed(
+            self,
+            keywords: list,
+            date_from: date_type,
+            date_to: date_type,
+            groups: dict,
+            max_posts: int = 5000
+    ) -> list:
+        """
+        Поиск по ключевым словам сразу по всем группам (newsfeed.search).
+
+        groups — {owner_id: group_name} групп, посты которых нужно оставить.
+        Период передаётся в ВК (start_time / end_time), пагинация — через next_from.
+        ВК отдаёт не более 1000 результатов на запрос — для узких тем этого достаточно,
+        для широких лучше wall.search по группам.
+        """
+        ts_from, ts_to = self._date_bounds(date_from, date_to)
+        found = {}
+        pages = 0
+        skipped = 0
+        try:
+            for keyword in keywords:
+                next_from = None
+                while len(found) < max_posts:
+                    params = {"q": keyword, "count": 200, "start_time": ts_from, "end_time": ts_to, "extended": 0}
+                    if next_from:
+                        params["start_from"] = next_from
+                    try:
+                        response = self._call("newsfeed.search", self.vk.newsfeed.search, **params)
+                    except Exception as e:
+                        raise Exception(f"Ошибка поиска по ленте: {e}")
+
+                    page = response.get('items', [])
+                    items = [i for i in page if i.get('owner_id') in groups]
+                    self._resolve_origins(items)
+                    for item in items:
+                        post = self._build_post(item, item['owner_id'], groups[item['owner_id']])
+                        found.setdefault(post['post_id'], post)
+                    pages += 1
+                    skipped += len(page) - len(items)
+                    oldest = min((i.get('date', 0) for i in page), default=None)
+                    self._report_progress(self.NEWSFEED_GROUP, pages, len(found), skipped, oldest)
+
+                    next_from = response.get('next_from')
+                    if not next_from or not response.get('items'):
+                        break
+        except CollectionCancelled:
+            self.logger.warning(f"Поиск по ленте прерван, найдено постов: {len(found)}")
+
+        posts = sorted(found.values(), key=lambda p: p['date'], reverse=True)
+        return posts[:max_posts]
+
+    def _execute_batch(self, calls: list) -> list:
+        """
+        Выполнение до 25 вызовов API одним запросом execute.
+
+        calls — список пар (метод, параметры), например ("wall.getComments", {...}).
+        Возвращает список ответов в том же порядке; неудачный вызов даёт False.
+        """
+        if len(calls) > self.EXECUTE_BATCH_SIZE:
+            raise ValueError(f"execute принимает не более {self.EXECUTE_BATCH_SIZE} вызовов")
+        code = "return [" + ",".join(
+            f"API.{method}({json.dumps(params, ensure_ascii=False)})" for method, params in calls
+        ) + "];"
+        return self._call("execute", self.vk.execute, code=code) or []
+
+    def iter_comments(self, posts: list, threads_depth: int = 10):
+        """
+        Пакетный сбор комментариев через execute + wall.getComments.
+
+        Посты без комментариев пропускаются, длинные ветки обходятся постранично
+        (по 100 комментариев). Первые `threads_depth` ответов (не больше 10 — предел ВК)
+        приходят вместе с комментарием, остальные дозапрашиваются по comment_id.
+        Генератор отдаёт комментарии пачками по мере получения — их можно сразу
+        писать на диск, не держа все в памяти.
+        """
+        page_size = 100
+        # Очередь заданий: (owner_id, post_id, offset, ключ поста, ID комментария для ответов или None)
+        pending = []
+        for post in posts:
+            if post.get('comments', 0) <= 0:
+                continue
+            owner_id, item_id = post['post_id'].rsplit('_', 1)
+            pending.append((int(owner_id), int(item_id), 0, post['post_id'], None))
+
+        while pending:
+            batch, pending = pending[:self.EXECUTE_BATCH_SIZE], pending[self.EXECUTE_BATCH_SIZE:]
+            calls = []
+            for owner_id, item_id, offset, _, comment_id in batch:
+                params = {
+                    "owner_id": owner_id,
+                    "post_id": item_id,
+                    "offset": offset,
+                    "count": page_size,
+                    "sort": "asc",
+                    "preview_length": 0
+                }
+                if comment_id:
+                    params["comment_id"] = comment_id  # Ответы в ветке комментария
+                else:
+                    params["thread_items_count"] = threads_depth
+                calls.append(("wall.getComments", params))
+            try:
+                responses = self._execute_batch(calls)
+            except Exception as e:
+                self.logger.warning(f"Ошибка пакетного получения комментариев ({len(batch)} запросов): {e}")
+                continue
+
+            comments = []
+            for (owner_id, item_id, offset, post_key, comment_id), response in zip(batch, responses):
+                if not response:
+                    # Комментарии закрыты или пост удалён
+                    continue
+                items = response.get('items', [])
+                for item in items:
+                    comments.append(self._comment_to_row(post_key, item, parent_id=comment_id))
+                    thread = item.get('thread', {})
+                    replies = thread.get('items', [])
+                    for reply in replies:
+                        comments.append(self._comment_to_row(post_key, reply, parent_id=item.get('id')))
+                    if thread.get('count', 0) > len(replies):
+                        # В ответе только начало ветки — остальное отдельными запросами
+                        pending.append((owner_id, item_id, len(replies), post_key, item.get('id')))
+
+                total = response.get('current_level_count', response.get('count', 0))
+                if items and offset + page_size < total:
+                    pending.append((owner_id, item_id, offset + page_size, post_key, comment_id))
+
+            if comments:
+                yield comments
+
+    def _fetch_posts_by_id(self, post_ids: list):
+        """
+        Посты по идентификаторам owner_id_post_id через wall.getById
+        (100 постов на вызов, до 25 вызовов в одном execute).
+
+        Генератор сырых объектов постов; удалённые и недоступные посты пропускаются.
+        """
+        ids_per_call = 100
+        chunks = [post_ids[i:i + ids_per_call] for i in range(0, len(post_ids), ids_per_call)]
+        for start in range(0, len(chunks), self.EXECUTE_BATCH_SIZE):
+            calls = [
+                ("wall.getById", {"posts": ",".join(chunk), "extended": 0})
+                for chunk in chunks[start:start + self.EXECUTE_BATCH_SIZE]
+            ]
+            try:
+                responses = self._execute_batch(calls)
+            except Exception as e:
+                self.logger.warning(f"Ошибка пакетного запроса wall.getById ({len(calls)} пакетов): {e}")
+                continue
+
+            for response in responses:
+                if not response:
+                    continue
+                # В новых версиях API ответ обёрнут в {'items': [...]}
+                items = response.get('items', []) if isinstance(response, dict) else response
+                yield from items
+
+    def get_post_counters(self, post_ids: list) -> dict:
+        """
+        Текущие счётчики постов через wall.getById.
+
+        post_ids — идентификаторы вида owner_id_post_id.
+        Возвращает {post_id: {'likes': int, 'reposts': int, 'comments': int}};
+        удалённые и недоступные посты в ответ не попадают.
+        """
+        counters = {}
+        for item in self._fetch_posts_by_id(post_ids):
+            counters[f"{item.get('owner_id')}_{item.get('id')}"] = {
+                'likes': item.get('likes', {}).get('count', 0),
+                'reposts': item.get('reposts', {}).get('count', 0),
+                'comments': item.get('comments', {}).get('count', 0)
+            }
+        return counters
+
+    def _comment_to_row(self, post_key: str, item: dict, parent_id: int = None) -> dict:
+        """Комментарий в плоском формате для экспорта"""
+        return {
+            'post_id': post_key,
+            'comment_id': item.get('id'),
+            'parent_id': parent_id,
+            'from_id': item.get('from_id'),
+            'date': datetime.fromtimestamp(item.get('date', 0), tz=timezone.utc),
+            'text': self._clean_vk_links(item.get('text', '')),
+            'likes': item.get('likes', {}).get('count', 0)
+        }
+
+    def _resolve_origins(self, items: list):
+        """
+        Заполнение кэша оригиналов для всей цепочки репостов у пачки постов.
+
+        Оригиналы, пришедшие без текста (обрезанные ответы API), дозапрашиваются
+        одним пакетом через wall.getById. Уже известные оригиналы не обрабатываются повторно.
+        """
+        originals = {}
+        for item in items:
+            for original in item.get('copy_history') or []:
+                originals.setdefault(f"{original.get('owner_id')}_{original.get('id')}", original)
+
+        missing = self.origin_cache.missing(originals)
+        if not missing:
+            return
+
+        resolved = {}
+        to_fetch = []
+        for key in missing:
+            original = originals[key]
+            if 'text' in original:
+                resolved[key] = self._clean_vk_links(original['text'].strip())
+            else:
+                to_fetch.append(key)
+
+        if to_fetch:
+            for fetched in self._fetch_posts_by_id(to_fetch):
+                key = f"{fetched.get('owner_id')}_{fetched.get('id')}"
+                resolved[key] = self._clean_vk_links(fetched.get('text', '').strip())
+            # Недоступные оригиналы запоминаем пустыми, чтобы не запрашивать снова
+            for key in to_fetch:
+                resolved.setdefault(key, "")
+
+        self.origin_cache.put_many(resolved)
+
     def _extract_full_text(self, post: dict) -> str:
-        """Извлечение полного текста поста с обработкой репостов и упоминаний"""
+        """Извлечение полного текста поста с обработкой цепочки репостов и упоминаний"""
         parts = []
 
         # Основной текст
@@ -182,15 +860,17 @@ class VKClient:
         if main_text:
             parts.append(self._clean_vk_links(main_text))
 
-        # Обработка репостов (copy_history)
-        copy_history = post.get('copy_history')
-        if copy_history and len(copy_history) > 0:
-            original = copy_history[0]
-            orig_text = original.get('text', '').strip()
+        # Обработка репостов (copy_history — вся цепочка, от ближайшего к исходному)
+        for original in post.get('copy_history') or []:
+            key = f"{original.get('owner_id')}_{original.get('id')}"
+            orig_text = self.origin_cache.get(key)
+            if orig_text is None:
+                orig_text = self._clean_vk_links(original.get('text', '').strip())
+                self.origin_cache.put_many({key: orig_text})
             if orig_text:
                 # Добавляем префикс репоста
                 prefix = "🔁 [Репост] "
-                parts.append(prefix + self._clean_vk_links(orig_text))
+                parts.append(prefix + orig_text)
 
         return "\n\n".join(parts) if parts else ""
 
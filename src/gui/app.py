@@ -8,15 +8,28 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import queue
 import threading
+import webbrowser
+from contextlib import nullcontext
 from ..utils.config import AppConfig
 from ..utils.logger import GuiLogger
 from ..core.vk_client import VKClient
 from ..utils.security import hash_token_for_display
-from ..core.excel_exporter import ExcelExporter
+from ..core.excel_exporter import ExcelExporter, CommentsWriter
+from ..core.scheduler import JobScheduler
+from ..core.refresher import EngagementRefresher
+from ..core.origin_cache import OriginCache
+from ..core.data_processor import KeywordFilter
+from ..core.search_index import PostIndex
+from ..core.transport import CollectionCancelled
+from ..core.progress import ProgressTracker
+from ..core.pipeline import ExportPipeline
+from ..core.media import MediaDownloader
+from ..core.response_cache import ResponseCache, DEFAULT_TTLS
+from ..utils.profiler import RunProfiler
 
 
 class VKCollectorApp:
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, profiling: bool = False):
         self.root = root
         self.root.title("VK Post Collector")
         self.root.geometry("900x700")
@@ -42,9 +55,34 @@ class VKCollectorApp:
         self.vk_token = self.config.get_token() or ""
         self.vk_client = None
 
+        # Кэш оригиналов репостов — общий для всех групп и запусков
+        self.origin_cache = OriginCache(self.config.config_dir / "origins.sqlite")
+
+        # Дисковый кэш ответов API — для повторных прогонов того же периода (по умолчанию выключен)
+        self.response_cache = None
+        cache_settings = self.config.get_response_cache_settings()
+        if cache_settings["enabled"] or cache_settings["replay"]:
+            self.response_cache = ResponseCache(
+                self.config.config_dir / "responses.sqlite",
+                ttls={**DEFAULT_TTLS, **cache_settings["ttl"]},
+                max_bytes=int(cache_settings["max_mb"] * 1024 * 1024),
+                replay=cache_settings["replay"]
+            )
+
+        # Полнотекстовый индекс собранных постов (пополняется при каждом сборе)
+        self.post_index = None
+        if self.config.get_search_index_enabled():
+            self.post_index = PostIndex(self.config.config_dir / "posts_index.sqlite")
+
         # Состояние сбора
         self.collection_thread = None
         self.is_collecting = False
+        self.cancel_event = threading.Event()  # Прерывает паузы и пагинацию внутри VKClient
+
+        # Профилирование (флаг --profile или ключ "profiling" в конфиге)
+        self.profiling = profiling or self.config.get_profiling_enabled()
+        if self.profiling:
+            self.gui_logger.info("Режим профилирования включён: профили сохраняются в директорию вывода")
 
         # Создаём интерфейс
         self._create_widgets()
@@ -74,6 +112,12 @@ class VKCollectorApp:
         notebook.add(self.run_frame, text="Запуск")
         self._create_run_tab()
 
+        # Вкладка 3: Поиск по собранным постам
+        if self.post_index:
+            self.search_frame = ttk.Frame(notebook)
+            notebook.add(self.search_frame, text="Поиск")
+            self._create_search_tab()
+
     def _create_settings_tab(self):
         """Создание вкладки 'Настройки'"""
         # Токен
@@ -107,7 +151,7 @@ class VKCollectorApp:
         token_frame.columnconfigure(1, weight=1)
 
         # Группы
-        groups_frame = ttk.LabelFrame(self.settings_frame, text="Список групп (до 30)", padding=10)
+        groups_frame = ttk.LabelFrame(self.settings_frame, text="Список групп", padding=10)
         groups_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
 
         ttk.Label(groups_frame,
@@ -140,6 +184,21 @@ class VKCollectorApp:
         groups_frame.columnconfigure(1, weight=1)
         groups_frame.rowconfigure(1, weight=1)
 
+        # Поиск по ключевым словам на стороне ВК
+        search_frame = ttk.LabelFrame(self.settings_frame, text="Поиск по ключевым словам (необязательно)",
+                                      padding=10)
+        search_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        ttk.Label(search_frame, text="Слова через запятую:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        self.keywords_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.keywords_var, width=50).grid(
+            row=0, column=1, sticky=tk.EW, padx=5, pady=5
+        )
+        self.newsfeed_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Искать сразу по всем группам (newsfeed.search, до 1000 результатов)",
+                        variable=self.newsfeed_var).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=5)
+        search_frame.columnconfigure(1, weight=1)
+
         # Период и директория
         bottom_frame = ttk.Frame(self.settings_frame)
         bottom_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -181,6 +240,10 @@ class VKCollectorApp:
                                    state=tk.DISABLED)
         self.stop_btn.pack(side=tk.LEFT, padx=5)
 
+        self.refresh_btn = ttk.Button(control_frame, text="🔄 Обновить метрики отчёта",
+                                      command=self._start_refresh)
+        self.refresh_btn.pack(side=tk.LEFT, padx=5)
+
         ttk.Button(control_frame, text="📁 Открыть папку с результатами", command=self._open_output_dir).pack(
             side=tk.RIGHT, padx=5)
 
@@ -217,6 +280,68 @@ class VKCollectorApp:
         # Запрет редактирования
         self.log_text.configure(state=tk.DISABLED)
 
+    def _create_search_tab(self):
+        """Создание вкладки 'Поиск' (полнотекстовый индекс собранных постов)"""
+        query_frame = ttk.Frame(self.search_frame)
+        query_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(query_frame, textvariable=self.search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        search_entry.bind("<Return>", lambda event: self._run_search())
+        ttk.Button(query_frame, text="🔍 Найти", command=self._run_search).pack(side=tk.LEFT)
+
+        self.search_status = ttk.Label(self.search_frame, text="Введите слова для поиска (все слова обязательны)")
+        self.search_status.pack(anchor=tk.W, padx=10)
+
+        results_frame = ttk.Frame(self.search_frame)
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        columns = ("date", "group", "snippet", "likes", "url")
+        self.search_results = ttk.Treeview(results_frame, columns=columns, show="headings")
+        for column, title, width in (("date", "Дата", 110), ("group", "Группа", 150), ("snippet", "Фрагмент", 400),
+                                     ("likes", "Лайки", 60), ("url", "Ссылка", 200)):
+            self.search_results.heading(column, text=title)
+            self.search_results.column(column, width=width, stretch=(column == "snippet"))
+        self.search_results.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        # Двойной клик — открыть пост в браузере
+        self.search_results.bind("<Double-1>", self._open_search_result)
+
+        scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.search_results.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.search_results.configure(yscrollcommand=scrollbar.set)
+
+    def _run_search(self):
+        """Поиск по индексу (миллисекунды — выполняется прямо в потоке GUI)"""
+        query = self.search_var.get().strip()
+        if not query:
+            return
+        started = datetime.now()
+        try:
+            results = self.post_index.search(query, limit=200)
+        except Exception as e:
+            self.search_status.config(text=f"Ошибка поиска: {e}")
+            return
+        elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+
+        self.search_results.delete(*self.search_results.get_children())
+        for result in results:
+            self.search_results.insert("", tk.END, values=(
+                result['date'].strftime("%d.%m.%Y %H:%M"),
+                result['group_name'],
+                result['snippet'].replace("\n", " "),
+                result['likes'],
+                result['post_url']
+            ))
+        self.search_status.config(text=f"Найдено: {len(results)} (за {elapsed_ms:.0f} мс)")
+
+    def _open_search_result(self, event):
+        """Открытие поста из результатов поиска в браузере"""
+        selection = self.search_results.selection()
+        if selection:
+            url = self.search_results.item(selection[0], "values")[4]
+            webbrowser.open(url)
+
     def _load_saved_settings(self):
         """Загрузка сохранённых настроек из конфига"""
         # Токен (только хеш для отображения)
@@ -231,6 +356,10 @@ class VKCollectorApp:
             self.groups_text.delete("1.0", tk.END)
             self.groups_text.insert("1.0", "\n".join(last_groups))
 
+        # Ключевые слова
+        self.keywords_var.set(", ".join(self.config.get_last_keywords()))
+        self.newsfeed_var.set(self.config.get_last_search_newsfeed())
+
         # Директория
         last_dir = self.config.get_last_output_dir()
         self.output_dir_var.set(last_dir)
@@ -284,7 +413,7 @@ class VKCollectorApp:
                 with open(file_path, "r", encoding="utf-8") as f:
                     groups = [line.strip() for line in f if line.strip()]
                 self.groups_text.delete("1.0", tk.END)
-                self.groups_text.insert("1.0", "\n".join(groups[:30]))  # Ограничение 30 групп
+                self.groups_text.insert("1.0", "\n".join(groups))
                 self.gui_logger.success(f"Загружено {len(groups)} групп из файла {Path(file_path).name}")
             except Exception as e:
                 self.gui_logger.error(f"Ошибка загрузки файла: {e}")
@@ -324,12 +453,6 @@ class VKCollectorApp:
             messagebox.showwarning("Внимание", "Введите хотя бы одну группу для сбора!")
             return
 
-        if len(groups) > 30:
-            if not messagebox.askyesno("Подтверждение",
-                                       f"Указано {len(groups)} групп (макс. 30). Обработать только первые 30?"):
-                return
-            groups = groups[:30]
-
         output_dir = self.output_dir_var.get().strip()
         if not output_dir:
             output_dir = self.config.get_last_output_dir()
@@ -344,9 +467,13 @@ class VKCollectorApp:
             messagebox.showerror("Ошибка", f"Неверный период:\n{e}")
             return
 
+        keywords = [k.strip() for k in self.keywords_var.get().split(",") if k.strip()]
+        newsfeed = self.newsfeed_var.get() and bool(keywords)
+
         # Сохраняем настройки
         self.config.save_last_groups(groups)
         self.config.save_last_output_dir(output_dir)
+        self.config.save_last_search(keywords, self.newsfeed_var.get())
 
         # Блокируем интерфейс
         self.start_btn.config(state=tk.DISABLED)
@@ -357,62 +484,252 @@ class VKCollectorApp:
 
         # Запускаем поток сбора
         self.is_collecting = True
+        self.cancel_event = threading.Event()
         self.collection_thread = threading.Thread(
             target=self._collection_worker,
-            args=(groups, date_from, date_to, output_dir),
+            args=(groups, date_from, date_to, output_dir, keywords, newsfeed),
             daemon=True
         )
         self.collection_thread.start()
 
-    def _collection_worker(self, groups: list, date_from: datetime, date_to: datetime, output_dir: str):
+    def _collection_worker(self, groups: list, date_from: datetime, date_to: datetime, output_dir: str,
+                           keywords: list = None, newsfeed: bool = False):
         """Рабочая функция сбора данных (выполняется в отдельном потоке)"""
+        profiler = RunProfiler(output_dir, self.gui_logger) if self.profiling else None
+        section = profiler.section("collection_worker") if profiler else nullcontext()
+        with section:
+            self._run_collection(groups, date_from, date_to, output_dir, profiler, keywords, newsfeed)
+
+    def _run_collection(self, groups: list, date_from: datetime, date_to: datetime, output_dir: str,
+                        profiler: RunProfiler = None, keywords: list = None, newsfeed: bool = False):
+        """Сбор постов по всем группам и экспорт в Excel"""
         all_posts = []  # Собираем все посты для единого экспорта
+        collected = [0]  # Число собранных постов (в конвейерном режиме all_posts их не хранит)
+        stream = pipeline = None
 
         try:
             # Инициализируем клиент ВК
-            self.vk_client = VKClient(self.vk_token)
-            total_groups = len(groups)
-
-            for idx, group in enumerate(groups, 1):
-                if not self.is_collecting:
-                    self.gui_logger.warning("Сбор остановлен пользователем")
-                    return
-
-                # Обновляем прогресс
-                progress = (idx - 1) / total_groups * 100
-                self.root.after(0, lambda p=progress, g=group: self._update_progress(p,
-                                                                                     f"Обработка группы {g} ({idx}/{total_groups})"))
-
+            if self.response_cache:
+                self.response_cache.hits = self.response_cache.misses = 0  # Статистика — за этот запуск
+            self.vk_client = VKClient(self.vk_token, origin_cache=self.origin_cache,
+                                      cancel_event=self.cancel_event, response_cache=self.response_cache)
+            self.vk_client.intra_group_shards = self.config.get_intra_group_shards()
+
+            # Локальный фильтр по ключевым / стоп-словам (строится один раз на запуск)
+            keyword_filter = KeywordFilter(*self.config.get_keyword_filter_words())
+            if keyword_filter:
+                self.gui_logger.info(
+                    f"Локальный фильтр: {len(keyword_filter.keywords.words)} ключевых слов, "
+                    f"{len(keyword_filter.stop_words.words)} стоп-слов"
+                )
+            scheduler = JobScheduler(
+                self.vk_client,
+                default_max_posts=self.config.get_max_posts_per_group(),
+                group_limits=self.config.get_group_limits(),
+                group_stats=self.config.get_group_stats(),
+                workers=self.config.get_scheduler_workers(),
+                should_stop=lambda: not self.is_collecting,
+                keywords=keywords,
+                post_filter=keyword_filter.apply if keyword_filter else None,
+                profiler=profiler
+            )
+
+            if keywords:
+                self.gui_logger.info(f"Поиск на стороне ВК по словам: {', '.join(keywords)}")
+
+            self.gui_logger.info(f"Планируем сбор {len(groups)} групп...")
+            try:
+                units = scheduler.plan(groups, date_from, date_to)
+            except CollectionCancelled:
+                units = []
+            total_groups = len(units)
+            done_lock = threading.Lock()
+
+            # Прогресс — по событиям каждой страницы; в Tk уходит не чаще раза в полсекунды
+            if newsfeed:
+                limits = {VKClient.NEWSFEED_GROUP: self.config.get_max_posts_per_group()}
+            else:
+                limits = {u.group: u.max_posts for u in units}
+            tracker = ProgressTracker(
+                limits, date_from, date_to,
+                emit=lambda snap: self.root.after(
+                    0, lambda: self._update_progress(snap.fraction * 100, snap.describe()))
+            )
+            self.vk_client.on_progress = tracker.page
+
+            # Конвейерный режим: выгрузка пишется параллельно со сбором, посты не копятся в памяти
+            exporter = ExcelExporter(output_dir, self.gui_logger, profiler=profiler,
+                                     **self.config.get_export_settings())
+            if self.config.get_pipelined_export() and not newsfeed:
                 try:
-                    self.gui_logger.info(f"Начинаем сбор постов из группы: {group}")
-                    posts = self.vk_client.get_posts_from_group(
-                        group_id=group,
-                        date_from=date_from,
-                        date_to=date_to
-                    )
-                    self.gui_logger.success(f"Получено {len(posts)} постов из группы {group}")
-                    all_posts.extend(posts)  # Добавляем посты в общий список
-
-                except Exception as e:
-                    self.gui_logger.error(f"Ошибка при сборе группы {group}: {e}")
-                    continue
-
-            # Экспорт в Excel после сбора всех групп
-            if all_posts and self.is_collecting:
+                    stream = exporter.open_stream(with_keywords=bool(keyword_filter.keywords))
+                    pipeline = ExportPipeline(stream.write)
+                except ValueError as e:
+                    self.gui_logger.warning(f"Конвейерная запись недоступна: {e}")
+
+            collect_comments = self.config.get_collect_comments()
+            media_settings = self.config.get_media_settings()
+            group_counts = {}  # Постов по группам в конвейерном режиме (сами посты уже переданы на запись)
+
+            def keep_refs(posts):
+                """Для комментариев и медиа после сбора достаточно ID поста и нужных полей"""
+                for p in posts:
+                    ref = {}
+                    if collect_comments and p.get('comments', 0) > 0:
+                        ref['comments'] = p['comments']
+                    if media_settings["download"]:
+                        media = [a for a in p.get('attachments', [])
+                                 if a['type'] in MediaDownloader.DOWNLOADABLE and a.get('url')]
+                        if media:
+                            ref['attachments'] = media
+                    if ref:
+                        all_posts.append(dict(ref, post_id=p['post_id']))
+
+            def on_page(unit, posts):
+                with done_lock:
+                    group_counts[unit.group] = group_counts.get(unit.group, 0) + len(posts)
+                    collected[0] += len(posts)
+                    keep_refs(posts)
+                if self.post_index:
+                    self.post_index.add_posts(posts)
+                pipeline.put(posts)  # Блокируется, если запись отстаёт
+
+            def on_result(unit, posts, error):
+                with done_lock:
+                    if pipeline:
+                        posts_count = group_counts.pop(unit.group, 0)
+                    else:
+                        posts_count = len(posts)
+                        collected[0] += posts_count
+                        all_posts.extend(posts)  # Добавляем посты в общий список
+                    if error:
+                        self.gui_logger.error(f"Ошибка при сборе группы {unit.group}: {error}")
+                    else:
+                        self.gui_logger.success(f"Получено {posts_count} постов из группы {unit.group}")
+                if self.post_index and posts:
+                    self.post_index.add_posts(posts)
+                tracker.group_done(unit.group, posts_count)
+
+            if newsfeed and units:
+                # Один поиск по ленте вместо обхода каждой группы
+                owners = {u.group_info[0]: u.group_info[1] for u in units if u.group_info}
+                if len(owners) < total_groups:
+                    self.gui_logger.warning(f"Для поиска по ленте разрешено {len(owners)} из {total_groups} групп")
+                found = self.vk_client.search_newsfeed(
+                    keywords, date_from, date_to, owners, max_posts=self.config.get_max_posts_per_group()
+                )
+                all_posts.extend(keyword_filter.apply(found) if keyword_filter else found)
+                collected[0] = len(all_posts)
+                tracker.group_done(VKClient.NEWSFEED_GROUP, len(all_posts))
+                if self.post_index:
+                    self.post_index.add_posts(all_posts)
+                self.gui_logger.success(f"Найдено {len(all_posts)} постов в ленте")
+            elif units:
+                # В конвейерном режиме посты уходят на запись постранично, не дожидаясь конца группы
+                scheduler.run(units, date_from, date_to, on_result, on_page=on_page if pipeline else None)
+                self.config.save_group_stats(scheduler.group_stats)
+
+            cancelled = not self.is_collecting
+            if self.response_cache:
+                self.gui_logger.info(
+                    f"Кэш ответов: {self.response_cache.hits} из кэша, {self.response_cache.misses} из сети"
+                )
+            if cancelled:
+                self.gui_logger.warning(f"Сбор остановлен пользователем, собрано {collected[0]} постов")
+
+            # Сбор комментариев (опционально) — пакетами через execute, сразу на диск
+            if all_posts and not cancelled and collect_comments:
+                with_comments = sum(1 for p in all_posts if p.get('comments', 0) > 0)
+                self.gui_logger.info(f"Собираем комментарии к {with_comments} постам...")
+                comments_writer = CommentsWriter(output_dir, self.gui_logger)
+                try:
+                    for comments in self.vk_client.iter_comments(all_posts):
+                        comments_writer.write(comments)
+                except CollectionCancelled:
+                    self.gui_logger.warning("Сбор комментариев прерван, записанные комментарии сохранены")
+                finally:
+                    comments_writer.close()
+
+            # Экспорт в Excel — в том числе частичных результатов после остановки
+            if pipeline:
+                pipeline.close()
+                excel_path = stream.close(partial=cancelled)
+                busy_time, pipeline = pipeline.busy_time, None  # Выгрузка сохранена — в finally закрывать нечего
+                if excel_path:
+                    self.gui_logger.success(f"✅ Данные сохранены в: {excel_path}")
+                    self.gui_logger.info(f"Запись выгрузки шла параллельно со сбором ({busy_time:.1f} сек)")
+            elif all_posts:
                 self.gui_logger.info(f"Экспортируем {len(all_posts)} постов в Excel...")
-                exporter = ExcelExporter(output_dir, self.gui_logger)
-                excel_path = exporter.export_posts(all_posts)
+                excel_path = exporter.export_posts(all_posts, partial=cancelled)
                 self.gui_logger.success(f"✅ Данные сохранены в: {excel_path}")
 
+            # Скачивание медиа из вложений (опционально, после сохранения отчёта)
+            if all_posts and not cancelled and media_settings["download"]:
+                downloader = MediaDownloader(output_dir, self.gui_logger, workers=media_settings["workers"],
+                                             should_stop=lambda: not self.is_collecting)
+                downloader.download(all_posts)
+
             # Завершение
-            if self.is_collecting:
-                self.root.after(0, lambda: self._finish_collection(success=True, posts_count=len(all_posts)))
+            if not cancelled:
+                self.root.after(0, lambda: self._finish_collection(success=True, posts_count=collected[0]))
             else:
-                self.root.after(0, lambda: self._finish_collection(success=False, cancelled=True))
+                self.root.after(0, lambda: self._finish_collection(
+                    success=False, cancelled=True, posts_count=collected[0]))
 
         except Exception as e:
             self.gui_logger.error(f"Критическая ошибка сбора: {e}")
             self.root.after(0, lambda: self._finish_collection(success=False, error=str(e)))
+        finally:
+            if pipeline:
+                # Сбор прервался ошибкой до сохранения — уже переданные строки сохраняем как частичный отчёт
+                self._save_partial_stream(pipeline, stream)
+
+    def _save_partial_stream(self, pipeline: ExportPipeline, stream):
+        """Завершение потока записи и сохранение конвейерной выгрузки с пометкой «частичный»"""
+        try:
+            pipeline.close()
+        except Exception as e:
+            self.gui_logger.error(f"Ошибка записи выгрузки: {e}")
+        try:
+            excel_path = stream.close(partial=True)
+        except Exception:
+            return  # Ошибка сохранения уже записана в лог
+        if excel_path:
+            self.gui_logger.warning(f"Частичная выгрузка сохранена: {excel_path}")
+
+    def _start_refresh(self):
+        """Обновление лайков/репостов/комментариев в ранее сохранённом отчёте"""
+        if not self.vk_token:
+            messagebox.showwarning("Внимание", "Сначала проверьте и сохраните токен!")
+            return
+
+        file_path = filedialog.askopenfilename(
+            title="Выберите отчёт (или оглавление) для обновления",
+            initialdir=self.output_dir_var.get().strip() or self.config.get_last_output_dir(),
+            filetypes=[("Книги Excel", "*.xlsx")]
+        )
+        if not file_path:
+            return
+
+        self.refresh_btn.config(state=tk.DISABLED)
+        self.status_var.set("Обновление метрик...")
+        threading.Thread(target=self._refresh_worker, args=(file_path,), daemon=True).start()
+
+    def _refresh_worker(self, file_path: str):
+        """Обновление метрик отчёта (выполняется в отдельном потоке)"""
+        try:
+            refresher = EngagementRefresher(VKClient(self.vk_token), self.gui_logger)
+            changed = refresher.refresh(file_path)
+            status = f"Метрики обновлены: изменено {changed} значений"
+        except Exception as e:
+            self.gui_logger.error(f"Ошибка обновления метрик: {e}")
+            status = f"Ошибка: {e}"
+
+        def done():
+            self.refresh_btn.config(state=tk.NORMAL)
+            self.status_var.set(status)
+
+        self.root.after(0, done)
 
     def _update_progress(self, value: float, label: str):
         """Обновление прогресс-бара и метки (вызывается из основного потока)"""
@@ -426,7 +743,10 @@ class VKCollectorApp:
         self.stop_btn.config(state=tk.DISABLED)
 
         if cancelled:
-            self.status_var.set("Сбор остановлен пользователем")
+            if posts_count:
+                self.status_var.set(f"Сбор остановлен пользователем. Сохранено {posts_count} постов (частично)")
+            else:
+                self.status_var.set("Сбор остановлен пользователем")
             self.gui_logger.warning("Сбор данных прерван пользователем")
         elif success:
             self.status_var.set(f"Сбор завершён! Сохранено {posts_count} постов")
@@ -440,6 +760,7 @@ class VKCollectorApp:
     def _stop_collection(self):
         """Остановка сбора по нажатию кнопки"""
         self.is_collecting = False
+        self.cancel_event.set()
         self.status_var.set("Остановка сбора...")
         self.gui_logger.warning("Пользователь запросил остановку сбора")
 
@@ -4,6 +4,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sys
 import os
+import multiprocessing
 import traceback
 from pathlib import Path
 
@@ -37,9 +38,160 @@ if sys.platform == "win32":
         pass
 
 
+def run_daemon():
+    """Фоновый режим: непрерывный опрос групп из конфига без графического интерфейса"""
+    import logging
+    from src.utils.config import AppConfig
+    from src.utils.logger import GuiLogger
+    from src.core.vk_client import VKClient
+    from src.core.excel_exporter import ExcelExporter
+    from src.core.poller import GroupPoller
+    from src.core.origin_cache import OriginCache
+    from src.core.data_processor import KeywordFilter
+    from src.core.search_index import PostIndex
+
+    config = AppConfig()
+    gui_logger = GuiLogger(gui=False)
+    # Логи модулей core (VKClient, опрос) — в те же файл и консоль
+    core_logger = logging.getLogger("src")
+    core_logger.setLevel(logging.INFO)
+    for handler in gui_logger.get_logger().handlers:
+        core_logger.addHandler(handler)
+
+    token = config.get_token()
+    groups = config.get_last_groups()
+    if not token or not groups:
+        gui_logger.error("Для фонового режима нужны сохранённый токен и список групп (запустите GUI один раз)")
+        sys.exit(1)
+
+    output_dir = config.get_last_output_dir()
+    exporter = ExcelExporter(output_dir, gui_logger, **config.get_export_settings())
+    keyword_filter = KeywordFilter(*config.get_keyword_filter_words())
+    post_index = PostIndex(config.config_dir / "posts_index.sqlite") if config.get_search_index_enabled() else None
+
+    def on_posts(posts):
+        if keyword_filter:
+            posts = keyword_filter.apply(posts)
+        if posts:
+            if post_index:
+                post_index.add_posts(posts)
+            exporter.export_posts(posts)
+    settings = config.get_daemon_settings()
+    poller = GroupPoller(
+        VKClient(token, origin_cache=OriginCache(config.config_dir / "origins.sqlite")),
+        groups,
+        on_posts=on_posts,
+        state=config.get_poll_state(),
+        on_state_change=config.save_poll_state,
+        min_interval=float(settings["min_interval"]),
+        max_interval=float(settings["max_interval"]),
+        target_posts_per_poll=float(settings["target_posts_per_poll"]),
+        initial_days=int(settings["initial_days"])
+    )
+
+    gui_logger.info(f"Фоновый опрос {len(groups)} групп, результаты в: {output_dir}")
+    try:
+        poller.run_forever()
+    except KeyboardInterrupt:
+        poller.stop()
+        gui_logger.info("Фоновый режим остановлен (Ctrl+C)")
+
+
+def run_service():
+    """Режим сервиса: HTTP API заданий сбора с общим рейт-лимитом, кэшами и индексом"""
+    import logging
+    from src.utils.config import AppConfig
+    from src.utils.logger import GuiLogger
+    from src.core.vk_client import VKClient
+    from src.core.origin_cache import OriginCache
+    from src.core.response_cache import ResponseCache, DEFAULT_TTLS
+    from src.core.search_index import PostIndex
+    from src.core.service import CollectionService, create_server
+
+    config = AppConfig()
+    gui_logger = GuiLogger(gui=False)
+    core_logger = logging.getLogger("src")
+    core_logger.setLevel(logging.INFO)
+    for handler in gui_logger.get_logger().handlers:
+        core_logger.addHandler(handler)
+
+    token = config.get_token()
+    if not token:
+        gui_logger.error("Для режима сервиса нужен сохранённый токен (запустите GUI один раз)")
+        sys.exit(1)
+
+    response_cache = None
+    cache_settings = config.get_response_cache_settings()
+    if cache_settings["enabled"] or cache_settings["replay"]:
+        response_cache = ResponseCache(
+            config.config_dir / "responses.sqlite",
+            ttls={**DEFAULT_TTLS, **cache_settings["ttl"]},
+            max_bytes=int(cache_settings["max_mb"] * 1024 * 1024),
+            replay=cache_settings["replay"]
+        )
+    client = VKClient(token, origin_cache=OriginCache(config.config_dir / "origins.sqlite"),
+                      response_cache=response_cache)
+    client.intra_group_shards = config.get_intra_group_shards()
+    post_index = PostIndex(config.config_dir / "posts_index.sqlite") if config.get_search_index_enabled() else None
+
+    settings = config.get_service_settings()
+    service = CollectionService(
+        client,
+        output_dir=config.get_last_output_dir(),
+        logger=gui_logger,
+        workers=int(settings["workers"]),
+        scheduler_workers=config.get_scheduler_workers(),
+        default_max_posts=config.get_max_posts_per_group(),
+        group_limits=config.get_group_limits(),
+        export_settings=config.get_export_settings(),
+        post_index=post_index
+    )
+    server = create_server(service, settings["host"], int(settings["port"]), settings["api_key"])
+    gui_logger.info(f"Сервис сбора слушает http://{settings['host']}:{settings['port']}/jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        gui_logger.info("Сервис остановлен (Ctrl+C)")
+
+
+def run_search(query: str):
+    """Поиск по индексу собранных постов из командной строки"""
+    from src.utils.config import AppConfig
+    from src.core.search_index import PostIndex
+
+    config = AppConfig()
+    index_path = config.config_dir / "posts_index.sqlite"
+    if not index_path.exists():
+        print("Индекс пуст: сначала выполните сбор постов")
+        sys.exit(1)
+
+    index = PostIndex(index_path)
+    results = index.search(query, limit=50)
+    print(f"Найдено: {len(results)} (индекс: {index.count()} постов)\n")
+    for result in results:
+        print(f"{result['date']:%d.%m.%Y %H:%M} | {result['group_name']} | {result['post_url']}")
+        print(f"    {result['snippet'].replace(chr(10), ' ')}")
+    index.close()
+
+
 def main():
     """Основная функция запуска приложения"""
+    if "--daemon" in sys.argv[1:]:
+        run_daemon()
+        return
+
+    if "--serve" in sys.argv[1:]:
+        run_service()
+        return
+
+    if "--search" in sys.argv[1:]:
+        query = " ".join(sys.argv[sys.argv.index("--search") + 1:])
+        run_search(query)
+        return
+
     root = None
+    profiling = "--profile" in sys.argv[1:]
     try:
         print("Создаём главное окно Tkinter...")
         root = tk.Tk()
@@ -66,13 +218,14 @@ def main():
         from src.gui.app import VKCollectorApp
 
         print("Создаём экземпляр приложения...")
-        app = VKCollectorApp(root)
+        app = VKCollectorApp(root, profiling=profiling)
 
         # Обработчик закрытия
         def on_closing():
             if hasattr(app, 'is_collecting') and app.is_collecting:
                 if messagebox.askokcancel("Подтверждение", "Сбор данных ещё идёт. Закрыть приложение?"):
                     app.is_collecting = False
+                    app.cancel_event.set()
                     root.destroy()
             else:
                 root.destroy()
@@ -109,4 +262,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Нужно для пула процессов экспорта в собранном .exe (PyInstaller)
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -1,18 +1,50 @@
 # -*- coding: utf-8 -*-
 """Работа с конфигурацией в защищённой директории пользователя"""
+import atexit
+import copy
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict
 from .security import obfuscate_token, deobfuscate_token, hash_token_for_display
 
+# Версия схемы config.json; при изменении схемы добавьте миграцию в _MIGRATIONS
+CONFIG_VERSION = 2
+
+
+def _migrate_v1(data: dict) -> dict:
+    """v1 — конфиг без поля version (ключи верхнего уровня не менялись)"""
+    return data
+
+
+# Миграции: версия файла → функция, переводящая данные в следующую версию
+_MIGRATIONS = {
+    1: _migrate_v1
+}
+
+
 class AppConfig:
+    SAVE_DELAY = 0.5  # Секунд тишины перед записью: серия изменений сохраняется одной записью
+    LOCK_TIMEOUT = 10.0  # Секунд ожидания блокировки config.json; более старая блокировка считается брошенной
+
     def __init__(self):
         # Путь к защищённой директории в AppData/Roaming (Windows)
         self.config_dir = Path(os.getenv("APPDATA", "~")) / ".vk_collector"
         self.config_file = self.config_dir / "config.json"
         self._ensure_config_dir()
+        self.lock_file = self.config_file.with_name(self.config_file.name + ".lock")
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dirty = False
+        self._changed = {}  # Ключи, изменённые этим процессом и ещё не записанные
+        self._deadline = 0.0
+        self._writer = None
         self.data = self._load_config()
 
 
@@ -41,26 +73,178 @@ class AppConfig:
             print(f"→ Используем резервную директорию: {self.config_dir}")
 
     def _load_config(self) -> dict:
-        """Загрузка конфига или создание пустого"""
-        if self.config_file.exists():
+        """Загрузка конфига (с миграцией схемы) или создание пустого"""
+        if not self.config_file.exists():
+            return {"version": CONFIG_VERSION}
+        try:
+            with open(self.config_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError("ожидался JSON-объект")
+        except Exception as e:
+            # Повреждённый файл не перезаписываем молча — откладываем в сторону для разбора
+            broken = self.config_file.with_name(f"config.broken_{time.strftime('%Y%m%d_%H%M%S')}.json")
             try:
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+                self.config_file.replace(broken)
+                print(f"⚠️  Конфиг повреждён ({e}), сохранён как {broken.name}; используются настройки по умолчанию")
+            except OSError:
+                print(f"⚠️  Конфиг повреждён ({e}); используются настройки по умолчанию")
+            return {"version": CONFIG_VERSION}
+
+        version = int(data.get("version", 1))
+        if version > CONFIG_VERSION:
+            print(
+                f"⚠️  Конфиг версии {version} новее поддерживаемой ({CONFIG_VERSION}); "
+                f"неизвестные ключи сохраняются"
+            )
+            return data
+        return self._migrate(data)
+
+    @staticmethod
+    def _migrate(data: dict) -> dict:
+        """Перевод данных конфига в текущую версию схемы"""
+        version = int(data.get("version", 1))
+        while version < CONFIG_VERSION:
+            data = _MIGRATIONS[version](data)
+            version += 1
+        data["version"] = max(version, CONFIG_VERSION)  # Записывается на диск при ближайшем сохранении
+        return data
+
+    def _update(self, **items):
+        """Изменение ключей конфига с отложенным сохранением (значения копируются)"""
+        with self._lock:
+            for key, value in items.items():
+                self.data[key] = copy.deepcopy(value)
+                self._changed[key] = self.data[key]
+        self._save_config()
 
     def _save_config(self):
-        """Сохранение конфига"""
-        with open(self.config_file, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        """
+        Отложенное сохранение конфига в фоновом потоке.
+
+        Изменения, сделанные в течение SAVE_DELAY секунд, записываются одним
+        разом, вызывающий поток (в том числе поток Tk) на диск не ждёт.
+        При выходе из программы несохранённые изменения записываются (flush).
+        """
+        with self._lock:
+            self._dirty = True
+            self._deadline = time.monotonic() + self.SAVE_DELAY
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._writer_loop, name="config-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        self._wake.set()
+
+    def _writer_loop(self):
+        while True:
+            self._wake.wait()
+            # Ждём, пока изменения не прекратятся на SAVE_DELAY секунд
+            while True:
+                with self._lock:
+                    delay = self._deadline - time.monotonic()
+                if delay <= 0:
+                    break
+                time.sleep(delay)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Немедленная запись несохранённых изменений.
+
+        Конфиг пишут несколько процессов (GUI, --daemon, --serve), поэтому
+        под файловой блокировкой файл перечитывается и в него вносятся только
+        ключи, изменённые этим процессом: чужие изменения (токен из GUI,
+        состояние опроса демона) не затираются и подхватываются в self.data.
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                changed = copy.deepcopy(self._changed)
+                self._changed = {}
+                self._dirty = False
+            try:
+                with self._file_lock():
+                    merged = self._read_disk()
+                    merged.update(changed)
+                    merged["version"] = max(int(merged.get("version", 1)), CONFIG_VERSION)
+                    self._write_atomic(json.dumps(merged, ensure_ascii=False, indent=2))
+                with self._lock:
+                    for key, value in merged.items():
+                        if key not in self._changed:  # Изменённое за время записи уйдёт следующей записью
+                            self.data[key] = value
+            except Exception as e:
+                with self._lock:
+                    for key, value in changed.items():
+                        self._changed.setdefault(key, value)
+                    self._dirty = True  # Повторим при следующем изменении или выходе
+                print(f"⚠️  Ошибка сохранения конфига: {e}")
+
+    def _read_disk(self) -> dict:
+        """Текущее содержимое config.json (пустой конфиг, если файла нет или он не читается)"""
+        try:
+            with open(self.config_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {"version": CONFIG_VERSION}
+        if not isinstance(data, dict):
+            return {"version": CONFIG_VERSION}
+        return self._migrate(data)
+
+    @contextmanager
+    def _file_lock(self):
+        """Межпроцессная блокировка config.json через файл config.json.lock"""
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(str(self.lock_file), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    stale = time.time() - self.lock_file.stat().st_mtime > self.LOCK_TIMEOUT
+                except OSError:
+                    continue  # Блокировку только что сняли
+                if stale or time.monotonic() > deadline:
+                    # Процесс, взявший блокировку, завершился аварийно — снимаем её
+                    try:
+                        self.lock_file.unlink()
+                    except OSError:
+                        pass
+                    deadline = time.monotonic() + self.LOCK_TIMEOUT
+                    continue
+                time.sleep(0.05)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            yield
+        finally:
+            try:
+                self.lock_file.unlink()
+            except OSError:
+                pass
+
+    def _write_atomic(self, payload: str):
+        """Запись во временный файл и замена им config.json — файл никогда не остаётся обрезанным"""
+        # Уникальное имя: одновременные записи из разных процессов не пишут в один временный файл
+        fd, tmp_name = tempfile.mkstemp(dir=str(self.config_dir), prefix="config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, self.config_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
 
     def save_token(self, token: str, remember: bool = True):
         """Сохранение токена (если выбрана опция 'Запомнить')"""
         if remember:
-            self.data["obfuscated_token"] = obfuscate_token(token)
-            self.data["token_hash"] = hash_token_for_display(token)
-            self._save_config()
+            self._update(obfuscated_token=obfuscate_token(token), token_hash=hash_token_for_display(token))
 
     def get_token(self) -> Optional[str]:
         """Получение токена из конфига"""
@@ -71,18 +255,152 @@ class AppConfig:
 
     def save_last_groups(self, groups: List[str]):
         """Сохранение последних использованных групп"""
-        self.data["last_groups"] = groups[:30]  # Ограничение 30 групп
-        self._save_config()
+        self._update(last_groups=groups)
 
     def get_last_groups(self) -> List[str]:
         """Получение последних групп"""
         return self.data.get("last_groups", [])
 
+    def save_last_search(self, keywords: List[str], newsfeed: bool):
+        """Сохранение ключевых слов поиска на стороне ВК"""
+        self._update(last_keywords=keywords, last_search_newsfeed=newsfeed)
+
+    def get_last_keywords(self) -> List[str]:
+        """Последние ключевые слова поиска"""
+        return self.data.get("last_keywords", [])
+
+    def get_last_search_newsfeed(self) -> bool:
+        """Искать ли через newsfeed.search (по всем группам сразу)"""
+        return bool(self.data.get("last_search_newsfeed", False))
+
     def save_last_output_dir(self, path: str):
         """Сохранение последней директории вывода"""
-        self.data["last_output_dir"] = path
-        self._save_config()
+        self._update(last_output_dir=path)
 
     def get_last_output_dir(self) -> str:
         """Получение последней директории вывода"""
-        return self.data.get("last_output_dir", str(Path.home() / "Desktop"))
\ No newline at end of file
+        return self.data.get("last_output_dir", str(Path.home() / "Desktop"))
+
+    def get_profiling_enabled(self) -> bool:
+        """Включён ли режим профилирования запусков (ключ "profiling" в конфиге)"""
+        return bool(self.data.get("profiling", False))
+
+    def get_max_posts_per_group(self) -> int:
+        """Лимит постов на группу по умолчанию"""
+        return int(self.data.get("max_posts_per_group", 5000))
+
+    def get_group_limits(self) -> Dict[str, int]:
+        """Индивидуальные лимиты постов для отдельных групп"""
+        return copy.deepcopy(self.data.get("group_limits", {}))
+
+    def get_scheduler_workers(self) -> int:
+        """Число потоков планировщика сбора"""
+        return int(self.data.get("scheduler_workers", 2))
+
+    def get_intra_group_shards(self) -> int:
+        """Число параллельных шардов при обходе одной большой группы (1 — последовательно)"""
+        return max(1, int(self.data.get("intra_group_shards", 1)))
+
+    def get_group_stats(self) -> Dict[str, dict]:
+        """Статистика прошлых сборов по группам (время сбора, постов в день)"""
+        with self._lock:
+            return copy.deepcopy(self.data.get("group_stats", {}))
+
+    def save_group_stats(self, stats: Dict[str, dict]):
+        """Сохранение статистики сборов по группам"""
+        self._update(group_stats=stats)
+
+    def get_daemon_settings(self) -> dict:
+        """Настройки режима непрерывного опроса (интервалы в секундах)"""
+        defaults = {
+            "min_interval": 300,
+            "max_interval": 86400,
+            "target_posts_per_poll": 20,
+            "initial_days": 1
+        }
+        defaults.update(self.data.get("daemon", {}))
+        return defaults
+
+    def get_poll_state(self) -> Dict[str, dict]:
+        """Состояние опроса групп (последний пост, интервал, частота публикаций)"""
+        with self._lock:
+            return copy.deepcopy(self.data.get("poll_state", {}))
+
+    def save_poll_state(self, state: Dict[str, dict]):
+        """Сохранение состояния опроса групп"""
+        self._update(poll_state=state)
+
+    def get_export_settings(self) -> dict:
+        """Параметры экспорта: разбиение на части (shard_by: null / "group" / "rows")"""
+        defaults = {
+            "shard_by": None,
+            "rows_per_shard": 100000,
+            "shard_target": "files",
+            "workers": None
+        }
+        defaults.update(self.data.get("export", {}))
+        return defaults
+
+    def get_pipelined_export(self) -> bool:
+        """Писать выгрузку параллельно со сбором (ключ "pipelined_export")"""
+        return bool(self.data.get("pipelined_export", False))
+
+    def get_collect_comments(self) -> bool:
+        """Собирать ли тексты комментариев (ключ "collect_comments")"""
+        return bool(self.data.get("collect_comments", False))
+
+    def get_media_settings(self) -> dict:
+        """Скачивание фото и документов из вложений (ключ "media": download, workers)"""
+        defaults = {
+            "download": False,
+            "workers": 4
+        }
+        defaults.update(self.data.get("media", {}))
+        return defaults
+
+    def get_response_cache_settings(self) -> dict:
+        """
+        Дисковый кэш ответов API (ключ "response_cache"): enabled, max_mb,
+        replay — только из кэша, ttl — сроки жизни по методам в секундах.
+        """
+        defaults = {
+            "enabled": False,
+            "max_mb": 500,
+            "replay": False,
+            "ttl": {}
+        }
+        defaults.update(self.data.get("response_cache", {}))
+        return defaults
+
+    def get_service_settings(self) -> dict:
+        """Настройки HTTP-сервиса (ключ "service"): адрес, порт, число параллельных заданий, ключ доступа"""
+        defaults = {
+            "host": "127.0.0.1",
+            "port": 8765,
+            "workers": 2,
+            "api_key": None
+        }
+        defaults.update(self.data.get("service", {}))
+        return defaults
+
+    def get_keyword_filter_words(self) -> tuple:
+        """
+        Слова локального фильтра: (ключевые слова, стоп-слова).
+
+        Задаются списками ("filter_keywords", "filter_stop_words") и/или
+        файлами по слову на строку ("filter_keywords_file", "filter_stop_words_file").
+        """
+        def load(list_key: str, file_key: str) -> List[str]:
+            words = list(self.data.get(list_key, []))
+            file_path = self.data.get(file_key)
+            if file_path:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    words.extend(line.strip() for line in f if line.strip())
+            return words
+
+        return (load("filter_keywords", "filter_keywords_file"),
+                load("filter_stop_words", "filter_stop_words_file"))
+
+    def get_search_index_enabled(self) -> bool:
+        """Вести ли полнотекстовый индекс собранных постов (ключ "search_index")"""
+        return bool(self.data.get("search_index", True))
@@ -22,8 +22,9 @@ class QueueHandler(logging.Handler):
 class GuiLogger:
     """Основной класс логгера приложения"""
 
-    def __init__(self, app_name: str = "VK Collector"):
+    def __init__(self, app_name: str = "VK Collector", gui: bool = True):
         self.app_name = app_name
+        self.gui = gui  # False — без очереди для GUI (фоновый режим, очередь некому разбирать)
         self.log_queue = queue.Queue()
         self._setup_logging()
 
@@ -60,9 +61,10 @@ class GuiLogger:
         self.logger.addHandler(console_handler)
 
         # Хендлер для очереди (для GUI)
-        queue_handler = QueueHandler(self.log_queue)
-        queue_handler.setLevel(logging.DEBUG)
-        self.logger.addHandler(queue_handler)
+        if self.gui:
+            queue_handler = QueueHandler(self.log_queue)
+            queue_handler.setLevel(logging.DEBUG)
+            self.logger.addHandler(queue_handler)
 
     def get_logger(self) -> logging.Logger:
         return self.logger
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Профилирование запусков сбора (cProfile + tracemalloc)"""
+import cProfile
+import io
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+class RunProfiler:
+    """Профилировщик секций одного запуска сбора.
+
+    Каждая секция пишет в директорию вывода два файла:
+    `профиль_<секция>_<время>.prof` (открывается через snakeviz / pstats)
+    и `память_<секция>_<время>.txt` (топ мест выделения памяти).
+    Вложенные секции профилируются отдельно: на время вложенной секции
+    внешний профилировщик приостанавливается. Секции в разных потоках
+    независимы (cProfile видит только свой поток).
+    """
+
+    def __init__(self, output_dir: str, logger, top_n: int = 25, summary_n: int = 5):
+        self.output_dir = Path(output_dir)
+        self.logger = logger
+        self.top_n = top_n
+        self.summary_n = summary_n
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._tracing_sections = 0
+        self._started_tracemalloc = False
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _start_tracemalloc(self):
+        with self._lock:
+            if self._tracing_sections == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._started_tracemalloc = True
+            self._tracing_sections += 1
+
+    def _stop_tracemalloc(self):
+        with self._lock:
+            self._tracing_sections -= 1
+            if self._tracing_sections == 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    @contextmanager
+    def section(self, name: str):
+        """Профилирование блока кода под именем `name`"""
+        stack = self._stack()
+        if stack:
+            stack[-1].disable()
+
+        self._start_tracemalloc()
+        snapshot_before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        stack.append(profile)
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: профилировщик один на процесс и уже активен в другом потоке
+            self.logger.warning(f"Секция '{name}' не профилируется: уже активен профилировщик другого потока")
+            stack.pop()
+            self._stop_tracemalloc()
+            if stack:
+                stack[-1].enable()
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            stack.pop()
+            try:
+                snapshot_after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                self._write_report(name, profile, snapshot_before, snapshot_after, peak)
+            except Exception as e:
+                self.logger.error(f"Ошибка сохранения профиля '{name}': {e}")
+            finally:
+                self._stop_tracemalloc()
+                if stack:
+                    stack[-1].enable()
+
+    def _write_report(self, name: str, profile: cProfile.Profile,
+                      snapshot_before: tracemalloc.Snapshot, snapshot_after: tracemalloc.Snapshot, peak: int):
+        """Сохранение профиля и топа выделений памяти + краткая сводка в лог"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        prof_path = self.output_dir / f"профиль_{name}_{timestamp}.prof"
+        mem_path = self.output_dir / f"память_{name}_{timestamp}.txt"
+
+        profile.dump_stats(str(prof_path))
+
+        # Текстовая версия профиля (дописывается в конец файла памяти)
+        stats_stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stats_stream)
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+
+        allocations = snapshot_after.compare_to(snapshot_before, "lineno")[:self.top_n]
+        with open(mem_path, "w", encoding="utf-8") as f:
+            f.write(f"Пиковое потребление памяти: {peak / 1024 / 1024:.1f} МБ\n\n")
+            f.write(f"Топ-{self.top_n} мест выделения памяти:\n")
+            for stat in allocations:
+                f.write(f"{stat}\n")
+            f.write("\n" + "=" * 60 + "\n")
+            f.write(stats_stream.getvalue())
+
+        # Краткая сводка горячих точек в лог
+        hotspots = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:self.summary_n]
+        self.logger.info(f"Профиль '{name}': {stats.total_tt:.2f} сек, пик памяти {peak / 1024 / 1024:.1f} МБ")
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in hotspots:
+            self.logger.info(
+                f"  🔥 {func} ({Path(filename).name}:{line}) — {tottime:.3f} сек собств., "
+                f"{cumtime:.3f} сек всего, вызовов: {ncalls}"
+            )
+        for stat in allocations[:3]:
+            frame = stat.traceback[0]
+            self.logger.info(
+                f"  🧠 {Path(frame.filename).name}:{frame.lineno} — {stat.size_diff / 1024:+.1f} КБ"
+            )
+        self.logger.info(f"Профиль сохранён: {prof_path.name}, {mem_path.name}")